@@ -1,29 +1,28 @@
 
-from llm_models import (
-    gemma,
-    groq_llama,
-    groq_r1_qwen,
-    groq_r1_llama,
-    groq_qwen,
-    llama_maverick_70b_together,
-    llama_70b_together_free
-)
+from llm_models import stage_models
 from prompt_templates import (
-    psychometric_analysis_prompt,
     missing_strengths_and_weakness_prompt,
-    corelated_domain_together_prompt,
-    item_analysis_2_prompt,
     judge_llm_prompt,
     format_text_prompt
 )
 
-from session_manager import update_session_status, session_status
+from session_manager import update_session_status, session_status, publish_stream
+from llm_cache import llm_cache
+from routing import routed_invoke
+from metrics import metrics_handler, record_retry_loop
+from config import RETRY_MAX_ATTEMPTS, RETRY_MAX_WALL_SECONDS, RETRY_MAX_TOKENS, MISSING_CHECK_LLM_FALLBACK, MISSING_CHECK_ESCALATE_AT, PROMPT_SLIMMING
 from utils import update_progress, correlated_domains
+from checks import rule_judge, parse_judgment, find_missing_domains, near_missing_threshold, listed_names, MISSING_THRESHOLD
+from prompt_slimming import SLIM_STAGES, slimming_report
+from scoring import CANNED_ANALYSES, RESPONSE_BIAS_NOTE, SOCIAL_DESIRABILITY_NOTE
 from schemas import ThinkTagParser, missing_domain_parser, MissingDomain
-from typing import TypedDict, Dict, List, Any
-from langgraph.graph import StateGraph, END
+from typing import TypedDict, Dict, List, Any, Annotated
+from langgraph.graph import StateGraph, START, END
 from langchain_core.output_parsers import StrOutputParser
 import asyncio
+import logging
+import operator
+import time
 
 # TypedDict for shared state
 class AnalysisState(TypedDict):
@@ -35,131 +34,406 @@ class AnalysisState(TypedDict):
     final_output: str
     item_analysis: str
     name: str
-# Global session tracker
-current_session_id: str | None = None
+    session_id: str
+    # Per-node timing records, appended by every node on both branches
+    timings: Annotated[List[Dict[str, Any]], operator.add]
+    critical_path: Dict[str, Any]
+    # Retry loop state and budget
+    exceeds_threshold: bool
+    is_acceptable: bool
+    attempts: int
+    attempt_log: List[Dict[str, Any]]
+    started_at: float
+    tokens_used: Annotated[int, operator.add]
+    max_attempts: int
+    max_wall_time: float
+    max_tokens: int
+    budget_exhausted: bool
+
+class StageStream:
+    """
+    Relays one LLM stage's output to the session's progress channel:
+    incremental "token" events while generating and a final "result" event.
+    A leading <think> block from reasoning models is withheld, matching ThinkTagParser.
+    """
+
+    def __init__(self, session_id: str, agent: str, progress: int, name: str = ""):
+        self.session_id = session_id
+        self.agent = agent
+        self.progress = progress
+        self.name = name
+        self.raw = ""
+        self.sent = 0
+
+    def visible(self) -> str:
+        text = self.raw.lstrip()
+        if text.startswith("<think>"):
+            return text.split("</think>", 1)[1].lstrip() if "</think>" in text else ""
+        # Hold back output that may still turn out to be the start of a <think> tag
+        return "" if "<think>".startswith(text) else self.raw
+
+    async def token(self, delta: str) -> None:
+        self.raw += delta
+        visible = self.visible()
+        if len(visible) > self.sent:
+            await publish_stream(self.session_id, self.agent, "token", visible[self.sent:], self.progress, self.name)
+            self.sent = len(visible)
+
+    async def reset(self) -> None:
+        """Discard partial output after the streaming model failed over to another."""
+        self.raw = ""
+        self.sent = 0
+        await publish_stream(self.session_id, self.agent, "reset", "", self.progress, self.name)
+
+    async def result(self, output: Any) -> None:
+        await publish_stream(self.session_id, self.agent, "result", str(output), self.progress, self.name)
+
+# LLM call helper
+async def invoke_chain(prompt, models, parser, inputs: Dict[str, Any], stage: str = None, refresh: bool = False,
+                       stream: StageStream = None):
+    """
+    Run prompt | model | parser over a stage's candidate models (see routing.routed_invoke).
+
+    Args:
+        prompt: Prompt template for the stage
+        models: Candidate chat models from stage_models, primary first
+        parser: Output parser applied to the completion
+        inputs: Template variables
+        stage: Cache namespace for the stage; outputs are only cached when set
+        refresh: Skip the cache lookup but still store the new output
+        stream: When given, tokens are streamed to the session as they arrive
+            and the parsed output is published once complete
+
+    Returns:
+        Tuple of (parsed model output, tokens spent; 0 on a cache hit)
+    """
+    output = None
+    cached = stage and llm_cache is not None
+    if cached and not refresh:
+        # Outputs are stored under the model that produced them, so any candidate's answer can serve
+        for model in models:
+            output = await llm_cache.aget(llm_cache.make_key(stage, prompt, inputs, model))
+            if output is not None:
+                break
+    tokens = 0
+    if output is None:
+        message, model = await routed_invoke(prompt, models, inputs, stream)
+        output = await parser.ainvoke(message)
+        tokens = (message.usage_metadata or {}).get("total_tokens", 0)
+        if cached:
+            await llm_cache.aset(llm_cache.make_key(stage, prompt, inputs, model), output)
+    if stream is not None:
+        await stream.result(output)
+    return output, tokens
+
+def stage_prompt(stage: str, state: AnalysisState):
+    """
+    Pick the prompt for a stage: the profile-slimmed variant carrying only the
+    definitions of the candidate's listed subdomains, or the full prompt.
+
+    Returns:
+        Tuple of (prompt, extra template inputs)
+    """
+    full, slim, definitions = SLIM_STAGES[stage]
+    if not PROMPT_SLIMMING:
+        return full, {}
+    return slim, {"domain_definitions": definitions.render(listed_names(state["scores"]))}
 
 # Agent implementations
 async def psychometric_analysis(state: AnalysisState, session_id: str) -> AnalysisState:
     await update_progress(session_id, "psychometric_analysis", "Running psychometric analysis…", 10, state["name"])
-    chain = psychometric_analysis_prompt | llama_70b_together_free | StrOutputParser()
-    analysis = chain.invoke({
+    # A retry means the previous (possibly cached) analysis was rejected, so bypass the cache
+    prompt, definitions = stage_prompt("psychometric_analysis", state)
+    analysis, tokens = await invoke_chain(prompt, stage_models("psychometric_analysis"), StrOutputParser(), {
         "strength": state["scores"]["strength"],
-        "development_area": state["scores"]["development_area"]
-    })
-    return {"analysis": analysis}
+        "development_area": state["scores"]["development_area"],
+        **definitions
+    }, stage="psychometric_analysis", refresh=state["attempts"] > 0,
+        stream=StageStream(session_id, "psychometric_analysis", 10, state["name"]))
+    return {"analysis": analysis, "attempts": state["attempts"] + 1, "tokens_used": tokens}
 
 async def check_missing_analysis(state: AnalysisState, session_id: str) -> AnalysisState:
     await update_progress(session_id, "check_missing", "Checking for missing strengths/weaknesses…", 35, state["name"])
-    chain = missing_strengths_and_weakness_prompt | groq_r1_llama | missing_domain_parser
-    missing = chain.invoke({
-        "strengths": state["scores"]["strength"],
-        "development_area": state["scores"]["development_area"],
-        "analysis": state["analysis"]
-    })
-    exceeds = len(missing.missing_strengths) > 4 or len(missing.missing_weaknesses) > 4
+    missing, unknown = find_missing_domains(state["scores"], state["analysis"])
+    tokens = 0
+    # Subdomains outside the alias table can only be judged by the model, and
+    # a result close to the retry threshold is confirmed by it before retrying
+    if (unknown and MISSING_CHECK_LLM_FALLBACK) or near_missing_threshold(missing, MISSING_CHECK_ESCALATE_AT):
+        missing, tokens = await invoke_chain(missing_strengths_and_weakness_prompt, stage_models("missing_domains"), missing_domain_parser, {
+            "strengths": state["scores"]["strength"],
+            "development_area": state["scores"]["development_area"],
+            "analysis": state["analysis"]
+        })
+    exceeds = len(missing.missing_strengths) > MISSING_THRESHOLD or len(missing.missing_weaknesses) > MISSING_THRESHOLD
     missing_count = len(missing.missing_strengths) + len(missing.missing_weaknesses)
-    return {"missing_count": missing_count, "exceeds_threshold": exceeds}
+    attempt = {
+        "attempt": state["attempts"],
+        "analysis": state["analysis"],
+        "missing_count": missing_count,
+        "exceeds_threshold": exceeds,
+        "is_acceptable": None,
+    }
+    return {
+        "missing_count": missing_count,
+        "exceeds_threshold": exceeds,
+        "attempt_log": state["attempt_log"] + [attempt],
+        "tokens_used": tokens,
+    }
 
 async def judge_analysis(state: AnalysisState, session_id: str) -> AnalysisState:
     await update_progress(session_id, "judge_analysis", "Evaluating analysis quality…", 50, state["name"])
-    chain = judge_llm_prompt | llama_70b_together_free | StrOutputParser()
-    judgment = chain.invoke({"analysis": state["analysis"]})
-    return {"is_acceptable": "acceptable" in judgment.lower()}
+    # Rule-based checks settle most analyses; only ambiguous endings reach the LLM judge
+    is_acceptable, tokens = rule_judge(state["analysis"], state["scores"]), 0
+    if is_acceptable is None:
+        judgment, tokens = await invoke_chain(judge_llm_prompt, stage_models("judge_analysis"), StrOutputParser(), {"analysis": state["analysis"]}, stage="judge_analysis")
+        is_acceptable = parse_judgment(judgment)
+    attempt_log = state["attempt_log"][:-1] + [{**state["attempt_log"][-1], "is_acceptable": is_acceptable}]
+    return {"is_acceptable": is_acceptable, "attempt_log": attempt_log, "tokens_used": tokens}
+
+async def select_best_attempt(state: AnalysisState, session_id: str) -> AnalysisState:
+    await update_progress(session_id, "select_best", "Retry budget spent, keeping the best attempt…", 60, state["name"])
+    best = min(state["attempt_log"], key=attempt_badness)
+    logging.info(
+        "Retry budget exhausted for '%s' after %d attempts; keeping attempt %d",
+        state["name"], state["attempts"], best["attempt"]
+    )
+    return {"analysis": best["analysis"], "budget_exhausted": True}
 
 async def correlated_domain_analysis(state: AnalysisState, session_id: str) -> AnalysisState:
     await update_progress(session_id, "correlated_analysis", "Analyzing correlated domains…", 65, state["name"] )
-    chain = corelated_domain_together_prompt | groq_r1_llama | ThinkTagParser()
-    corr = chain.invoke({
+    prompt, definitions = stage_prompt("correlated_analysis", state)
+    corr, tokens = await invoke_chain(prompt, stage_models("correlated_analysis"), ThinkTagParser(), {
         "analysis": state["analysis"],
-        "correlated_domains": correlated_domains
-    })
-    return {"final_output": corr}
+        "correlated_domains": correlated_domains,
+        **definitions
+    }, stage="correlated_analysis", stream=StageStream(session_id, "correlated_analysis", 65, state["name"]))
+    return {"final_output": corr, "tokens_used": tokens}
 
 async def check_bias_and_desirability(state: AnalysisState, session_id: str) -> AnalysisState:
     await update_progress(session_id, "check_bias", "Checking for bias/desirability…", 80, state["name"])
     out = state["final_output"]
     if state["metadata"]["response_bias"]:
-        out += "\n\nNote: response bias detected."
+        out += f"\n\n{RESPONSE_BIAS_NOTE}"
     if state["metadata"]["social_desirable"]:
-        out += "\n\nNote: possible social desirability."
+        out += f"\n\n{SOCIAL_DESIRABILITY_NOTE}"
     return {"final_output": out}
 
 async def item_analysis(state: AnalysisState, session_id: str) -> AnalysisState:
-    await update_progress(session_id, "item_analysis", "Performing item-level analysis…", 95, state["name"])
-    chain = item_analysis_2_prompt | llama_70b_together_free | StrOutputParser()
-    items = chain.invoke({
+    await update_progress(session_id, "item_analysis", "Performing item-level analysis…", 15, state["name"])
+    prompt, definitions = stage_prompt("item_analysis", state)
+    items, tokens = await invoke_chain(prompt, stage_models("item_analysis"), StrOutputParser(), {
         "strength": state["scores"]["strength"],
         "development_area": state["scores"]["development_area"],
-        "user_data": state["items"]
-    })
-    return {"item_analysis": items}
+        "user_data": state["items"],
+        **definitions
+    }, stage="item_analysis", stream=StageStream(session_id, "item_analysis", 15, state["name"]))
+    return {"item_analysis": items, "tokens_used": tokens}
+
+async def format_text(text: str, stream: StageStream = None):
+    """
+    Format one section with format_text_prompt, leaving canned text untouched.
+
+    Bias notes appended by check_bias_and_desirability are split off before
+    formatting and re-attached afterwards.
+
+    Args:
+        text: Section text to format
+        stream: Optional stream for the formatted tokens
+
+    Returns:
+        Tuple of (formatted text, tokens spent)
+    """
+    positions = [text.find(f"\n\n{note}") for note in (RESPONSE_BIAS_NOTE, SOCIAL_DESIRABILITY_NOTE)]
+    split = min([p for p in positions if p >= 0], default=len(text))
+    body, notes = text[:split], text[split:]
+    if not body.strip() or body in CANNED_ANALYSES:
+        return text, 0
+    formatted, tokens = await invoke_chain(format_text_prompt, stage_models("format_analysis"), StrOutputParser(), {"analysis": body}, stage="format_analysis", stream=stream)
+    return formatted + notes, tokens
 
 async def format_analysis(state: AnalysisState, session_id: str) -> AnalysisState:
     await update_progress(session_id, "formatting", "Formatting final output…", 95, state["name"])
-    chain = format_text_prompt | llama_70b_together_free | StrOutputParser()
-    state["final_output"] = chain.invoke({"analysis": state["final_output"]})
-    state["item_analysis"] = chain.invoke({"analysis": state["item_analysis"]})
-    return state
+    # Both sections are formatted concurrently
+    (final_output, final_tokens), (item_output, item_tokens) = await asyncio.gather(
+        format_text(state["final_output"], StageStream(session_id, "format_final_output", 95, state["name"])),
+        format_text(state["item_analysis"], StageStream(session_id, "format_item_analysis", 95, state["name"]))
+    )
+    return {"final_output": final_output, "item_analysis": item_output, "tokens_used": final_tokens + item_tokens}
+
+async def join_results(state: AnalysisState, session_id: str) -> AnalysisState:
+    await update_progress(session_id, "join_results", "Merging analysis results…", 95, state["name"])
+    path = critical_path(state["timings"])
+    logging.info(
+        "Critical path for '%s' (%s branch): %s (%.2fs, slack %.2fs)",
+        state["name"], path["branch"], " → ".join(path["nodes"]), path["duration"], path["slack"]
+    )
+    return {"critical_path": path}
+
+# Nodes that make up the item-analysis branch; everything else is the main chain
+ITEM_BRANCH = {"item_analysis_node"}
+
+def critical_path(timings: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Work out which parallel branch bounded the run's latency.
+
+    Args:
+        timings: Node timing records with 'node', 'start' and 'end' keys
+
+    Returns:
+        Dictionary with the critical branch, its nodes in execution order,
+        its duration in seconds and the slack of the other branch
+    """
+    run_start = min(t["start"] for t in timings)
+    branches = {
+        "item": [t for t in timings if t["node"] in ITEM_BRANCH],
+        "main": [t for t in timings if t["node"] not in ITEM_BRANCH],
+    }
+    ends = {b: max((t["end"] for t in ts), default=run_start) for b, ts in branches.items()}
+    critical = max(ends, key=ends.get)
+    other = "item" if critical == "main" else "main"
+    return {
+        "branch": critical,
+        "nodes": [t["node"] for t in sorted(branches[critical], key=lambda t: t["start"])],
+        "duration": ends[critical] - run_start,
+        "slack": ends[critical] - ends[other],
+        "steps": [
+            {"node": t["node"], "offset": t["start"] - run_start, "duration": t["end"] - t["start"]}
+            for t in sorted(timings, key=lambda t: t["start"])
+        ],
+    }
+
+def attempt_badness(attempt: Dict[str, Any]):
+    """Sort key ranking attempts from least to most bad; later attempts win ties."""
+    return (
+        attempt["is_acceptable"] is not True,
+        attempt["exceeds_threshold"],
+        attempt["missing_count"],
+        -attempt["attempt"],
+    )
+
+def budget_left(state: AnalysisState) -> bool:
+    """Whether another psychometric attempt fits in the attempt, wall-time and token budget."""
+    return (
+        state["attempts"] < state["max_attempts"]
+        and time.time() - state["started_at"] < state["max_wall_time"]
+        and state["tokens_used"] < state["max_tokens"]
+    )
+
+def route_after_missing(state: AnalysisState) -> str:
+    if not state["exceeds_threshold"]:
+        return "judge_analysis"
+    return "psychometric_analysis" if budget_left(state) else "select_best"
+
+def route_after_judge(state: AnalysisState) -> str:
+    if state["is_acceptable"]:
+        return "correlated_analysis"
+    return "psychometric_analysis" if budget_left(state) else "select_best"
+
+async def timed(node: str, agent, state: AnalysisState) -> AnalysisState:
+    """Run an agent for the graph and append its wall-clock timing to the state."""
+    start = time.perf_counter()
+    out = await agent(state, state["session_id"])
+    return {**out, "timings": [{"node": node, "start": start, "end": time.perf_counter()}]}
 
 # Async wrappers for StateGraph nodes
 async def run_psychometric(state: AnalysisState):
-    return await psychometric_analysis(state, current_session_id)
+    return await timed("psychometric_analysis", psychometric_analysis, state)
 
 async def run_check_missing(state: AnalysisState):
-    return await check_missing_analysis(state, current_session_id)
+    return await timed("check_missing", check_missing_analysis, state)
 
 async def run_judge(state: AnalysisState):
-    return await judge_analysis(state, current_session_id)
+    return await timed("judge_analysis", judge_analysis, state)
 
 async def run_correlated(state: AnalysisState):
-    return await correlated_domain_analysis(state, current_session_id)
+    return await timed("correlated_analysis", correlated_domain_analysis, state)
+
+async def run_select_best(state: AnalysisState):
+    return await timed("select_best", select_best_attempt, state)
 
 async def run_bias(state: AnalysisState):
-    return await check_bias_and_desirability(state, current_session_id)
+    return await timed("check_bias", check_bias_and_desirability, state)
 
 async def run_item_analysis(state: AnalysisState):
-    return await item_analysis(state, current_session_id)
+    return await timed("item_analysis_node", item_analysis, state)
 
 async def run_format(state: AnalysisState):
-    return await format_analysis(state, current_session_id)
+    return await timed("format_analysis", format_analysis, state)
+
+async def run_join(state: AnalysisState):
+    return await timed("join_results", join_results, state)
 
 # Build the workflow graph
 workflow = StateGraph(AnalysisState)
 workflow.add_node("psychometric_analysis", run_psychometric)
 workflow.add_node("check_missing", run_check_missing)
 workflow.add_node("judge_analysis", run_judge)
+workflow.add_node("select_best", run_select_best)
 workflow.add_node("correlated_analysis", run_correlated)
 workflow.add_node("check_bias", run_bias)
 workflow.add_node("item_analysis_node", run_item_analysis)
 workflow.add_node("format_analysis", run_format)
+workflow.add_node("join_results", run_join)
 
 # Define edges and transitions
+# Item analysis only needs scores and items, so it runs alongside the main chain
+workflow.add_edge(START, "psychometric_analysis")
+workflow.add_edge(START, "item_analysis_node")
 workflow.add_edge("psychometric_analysis", "check_missing")
+# Retry edges loop back to psychometric_analysis until the retry budget is spent
 workflow.add_conditional_edges(
     "check_missing",
-    lambda out: "psychometric_analysis" if out.get("exceeds_threshold") else "judge_analysis",
-    {"psychometric_analysis": "psychometric_analysis", "judge_analysis": "judge_analysis"}
+    route_after_missing,
+    {"psychometric_analysis": "psychometric_analysis", "judge_analysis": "judge_analysis", "select_best": "select_best"}
 )
 workflow.add_conditional_edges(
     "judge_analysis",
-    lambda out: "psychometric_analysis" if not out.get("is_acceptable") else "correlated_analysis",
-    {"psychometric_analysis": "psychometric_analysis", "correlated_analysis": "correlated_analysis"}
+    route_after_judge,
+    {"psychometric_analysis": "psychometric_analysis", "correlated_analysis": "correlated_analysis", "select_best": "select_best"}
 )
+workflow.add_edge("select_best", "correlated_analysis")
 workflow.add_edge("correlated_analysis", "check_bias")
-workflow.add_edge("check_bias", "item_analysis_node")
-workflow.add_edge("item_analysis_node", END)
+# Join waits for both branches before finishing
+workflow.add_edge(["check_bias", "item_analysis_node"], "join_results")
+workflow.add_edge("join_results", END)
 #workflow.add_edge("format_analysis", END)
-workflow.set_entry_point("psychometric_analysis")
 app = workflow.compile()
 
 # Main analyze function
 async def analyze_psychometric_scores(input_data: dict, session_id: str):
-    global current_session_id
-    current_session_id = session_id
+    # Carry the session id in the graph state so concurrent runs stay isolated
+    input_data = {**input_data, "session_id": session_id}
 
     await update_progress(session_id, "start", "Starting analysis…", 0, input_data["name"])
+    if PROMPT_SLIMMING:
+        report = slimming_report(listed_names(input_data["scores"]))
+        logging.info(
+            "Prompt slimming for '%s': %s", input_data["name"],
+            ", ".join(f"{stage} {r['full_tokens']}→{r['slim_tokens']} tokens (-{r['reduction']}%)" for stage, r in report.items())
+        )
     await asyncio.sleep(1)
-    result = await app.ainvoke(input_data)
+    result = await app.ainvoke({
+        "max_attempts": RETRY_MAX_ATTEMPTS,
+        "max_wall_time": RETRY_MAX_WALL_SECONDS,
+        "max_tokens": RETRY_MAX_TOKENS,
+        **input_data,
+        "timings": [],
+        "attempts": 0,
+        "attempt_log": [],
+        "started_at": time.time(),
+        "tokens_used": 0,
+        "budget_exhausted": False,
+    }, {
+        "recursion_limit": 100,
+        "callbacks": [metrics_handler],
+        "metadata": {"session_id": session_id},
+    })
+    record_retry_loop(session_id, result["attempts"], result["budget_exhausted"])
+    logging.info(
+        "Retry loop for '%s': %d attempts, %d tokens, %.2fs, budget exhausted: %s",
+        input_data["name"], result["attempts"], result["tokens_used"],
+        time.time() - result["started_at"], result["budget_exhausted"]
+    )
     await asyncio.sleep(1)
     await update_progress(session_id, "complete", "Analysis complete!", 100, input_data["name"])
 
@@ -0,0 +1,206 @@
+import re
+from typing import Dict, List, Any, Optional, Tuple
+from schemas import MissingDomain
+
+# Phrases that make a closing sentence an overall-tendency summary
+SUMMARY_MARKERS = (
+    "overall", "in summary", "in conclusion", "to summarize", "to sum up",
+    "all in all", "as a whole", "in general", "taken together",
+)
+# Phrases that only sometimes signal a summary; these defer to the LLM judge
+TENDENCY_MARKERS = ("tends to", "tendency", "generally", "typically", "broadly")
+
+# Phrases that count as mentioning a subdomain, keyed by normalized subdomain name.
+# The prompts ask for behaviours rather than subdomain names, so besides the
+# correlated_domains vocabulary this covers the wording of each definition and
+# of its (Strength) / (Development_area) phrases in the prompt definitions.
+SUBDOMAIN_ALIASES = {
+    "ability to work with others": [
+        r"work(?:ing)? with others", r"collaborat", r"teamwork", r"\bteams?\b", r"individual tasks",
+        r"\bgroups?\b", r"colleagues", r"interact\w* (?:effectively|well) with",
+    ],
+    "helping others": [r"help(?:ing|ful)", r"assist", r"support\w* (?:to )?(?:others|colleagues)"],
+    "emotional composure": [r"composure", r"\bcomposed\b", r"overly reactive"],
+    "insightfulness": [
+        r"insight", r"understand\w*[^.]{0,40}emotions", r"emotions (?:and|of) (?:those of )?others",
+        r"others\W?s? emotions", r"grasp over (?:their|his|her) emotions",
+    ],
+    "emotional management": [
+        r"emotional management", r"manag\w*\s+(?:their\s+|his\s+|her\s+)?emotions",
+        r"regulat\w*\s+(?:their\s+|his\s+|her\s+)?emotions", r"grasp over (?:their|his|her) emotions",
+        r"impulsiv", r"comparing (?:themselves|himself|herself)",
+    ],
+    "passive aggression": [
+        r"passive\s*aggress", r"passively", r"indirect", r"sarcas",
+        r"express\w*\s+(?:their\s+|his\s+|her\s+)?emotions?", r"expression of emotions",
+    ],
+    "problem solving": [
+        r"problem solving", r"solv\w* problems", r"solutions", r"overcom\w*[^.]{0,20}challenges?",
+        r"handl\w*[^.]{0,20}(?:challenges|difficulties)",
+    ],
+    "patience": [r"patien", r"\bdelays?\b", r"\bwait"],
+    "dutifulness": [
+        r"dutiful", r"responsib", r"procrastinat", r"diligen", r"attention to detail", r"\bduties\b",
+        r"tasks on time",
+    ],
+    "moral obligation": [
+        r"moral obligation", r"obligat", r"commit\w*\s+(?:to|towards)\s+(?:the\s+)?organi[sz]ation",
+        r"interest of the organi[sz]ation", r"loyal",
+    ],
+    "moral values": [r"moral values", r"ethic", r"honest", r"integrity", r"code of conduct", r"\brules\b"],
+    "fairness": [r"\bfair", r"impartial", r"regardless of others"],
+    "openness to limitations": [r"limitations", r"criticism", r"mistakes", r"shortcomings"],
+    "openness to growth": [r"growth", r"feedback", r"self.improvement", r"\bimprove"],
+    "openness to individuality": [
+        r"individuality", r"divers", r"temperaments", r"perspectives", r"individual differences",
+        r"people of varying",
+    ],
+    "openness to new experiences": [r"new experiences", r"\badapt", r"\bchange"],
+}
+# Names used before extract_score renamed them
+SUBDOMAIN_ALIASES["self control"] = SUBDOMAIN_ALIASES["emotional composure"]
+SUBDOMAIN_ALIASES["self regulation"] = SUBDOMAIN_ALIASES["emotional management"]
+
+# Domains listed among strengths or development areas count as mentioned
+# when any of their subdomains is
+DOMAIN_SUBDOMAINS = {
+    "teamwork": ["ability to work with others", "helping others"],
+    "emotional stability": [
+        "emotional composure", "insightfulness", "emotional management",
+        "passive aggression", "problem solving", "patience",
+    ],
+    "organizational values": ["dutifulness", "moral obligation"],
+    "organizational ethics": ["moral values", "fairness"],
+    "openness": [
+        "openness to limitations", "openness to growth",
+        "openness to individuality", "openness to new experiences",
+    ],
+}
+for _domain, _subdomains in DOMAIN_SUBDOMAINS.items():
+    SUBDOMAIN_ALIASES.setdefault(_domain, []).extend(
+        pattern for subdomain in _subdomains for pattern in SUBDOMAIN_ALIASES[subdomain]
+    )
+
+# Missing strengths or development areas beyond which an analysis is retried
+MISSING_THRESHOLD = 4
+
+COMPOSURE_PATTERN = re.compile(r"\bcomposure\b", re.IGNORECASE)
+SENTENCE_PATTERN = re.compile(r"[^.!?]+[.!?]*")
+THINK_PATTERN = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+MARKUP_PATTERN = re.compile(r"[*_`\"'“”#>]")
+REJECT_PATTERN = re.compile(r"\b(?:unacceptable|not acceptable)\b")
+ACCEPT_PATTERN = re.compile(r"\bacceptable\b")
+
+
+def listed_names(scores: Dict[str, List[Dict[str, Any]]]) -> List[str]:
+    """Subdomain names listed as strengths or development areas."""
+    return [
+        entry["name"]
+        for key in ("strength", "development_area")
+        for entry in scores.get(key, [])
+    ]
+
+
+def last_sentence(text: str) -> str:
+    """Return the final non-empty sentence of a paragraph, lowercased."""
+    sentences = [s.strip() for s in SENTENCE_PATTERN.findall(text) if s.strip()]
+    return sentences[-1].lower() if sentences else ""
+
+
+def rule_judge(analysis: str, scores: Dict[str, List[Dict[str, Any]]]) -> Optional[bool]:
+    """
+    Rule-based version of the judge_llm_prompt checks
+
+    Flags "composure" used without Emotional Composure among the listed
+    subdomains, and an analysis that closes on an overall-tendency sentence.
+
+    Args:
+        analysis: Generated psychometric analysis text
+        scores: Filtered strengths and development areas for the candidate
+
+    Returns:
+        True if acceptable, False if unacceptable, None when the closing
+        sentence is ambiguous and the LLM judge should decide
+    """
+    composure_listed = any("composure" in name.lower() for name in listed_names(scores))
+    if not composure_listed and COMPOSURE_PATTERN.search(analysis):
+        return False
+
+    closing = last_sentence(analysis)
+    if any(marker in closing for marker in SUMMARY_MARKERS):
+        return False
+    if any(marker in closing for marker in TENDENCY_MARKERS):
+        return None
+    return True
+
+
+def parse_judgment(judgment: str) -> bool:
+    """
+    Read the verdict of a judge_llm_prompt reply.
+
+    Markdown emphasis, quotes and <think> blocks are stripped first, so
+    replies like '**Acceptable**', '"Acceptable"' or 'The analysis is
+    acceptable.' all pass, while any 'unacceptable' or 'not acceptable' fails.
+
+    Returns:
+        True if the reply accepts the analysis
+    """
+    verdict = MARKUP_PATTERN.sub("", THINK_PATTERN.sub("", judgment)).lower()
+    if REJECT_PATTERN.search(verdict):
+        return False
+    return bool(ACCEPT_PATTERN.search(verdict))
+
+
+def normalize_domain(text: str) -> str:
+    """Lowercase and fold hyphens/underscores so subdomain names and prose compare equal."""
+    return " ".join(re.sub(r"[-_]", " ", str(text)).split()).lower()
+
+
+def is_mentioned(name: str, analysis: str) -> bool:
+    """Whether a subdomain, by name or any alias, appears in normalized analysis text."""
+    key = normalize_domain(name)
+    patterns = SUBDOMAIN_ALIASES.get(key, [re.escape(key)])
+    return any(re.search(pattern, analysis) for pattern in patterns)
+
+
+def find_missing_domains(
+    scores: Dict[str, List[Dict[str, Any]]], analysis: str
+) -> Tuple[MissingDomain, List[str]]:
+    """
+    Rule-based version of the missing_strengths_and_weakness_prompt check
+
+    Args:
+        scores: Filtered strengths and development areas for the candidate
+        analysis: Generated psychometric analysis text
+
+    Returns:
+        Tuple of (MissingDomain with the listed subdomains the analysis never
+        mentions, listed names that have no entry in SUBDOMAIN_ALIASES)
+    """
+    text = normalize_domain(analysis)
+    missing = MissingDomain(
+        missing_strengths=[
+            entry["name"] for entry in scores.get("strength", [])
+            if not is_mentioned(entry["name"], text)
+        ],
+        missing_weaknesses=[
+            entry["name"] for entry in scores.get("development_area", [])
+            if not is_mentioned(entry["name"], text)
+        ],
+    )
+    unknown = [name for name in listed_names(scores) if normalize_domain(name) not in SUBDOMAIN_ALIASES]
+    return missing, unknown
+
+
+def near_missing_threshold(missing: MissingDomain, escalate_at: int) -> bool:
+    """
+    Whether a local find_missing_domains result is close enough to
+    MISSING_THRESHOLD that the LLM check should confirm it before a retry.
+
+    Args:
+        missing: Result of find_missing_domains
+        escalate_at: Missing strengths or development areas that trigger the
+            LLM check; 0 never escalates
+    """
+    count = max(len(missing.missing_strengths), len(missing.missing_weaknesses))
+    return escalate_at > 0 and count >= escalate_at
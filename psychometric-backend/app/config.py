@@ -7,3 +7,68 @@ load_dotenv()  # Load from .env file
 TOGETHER_API_KEY = os.getenv("TOGETHER_API_KEY")
 # Groq_api_key
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+
+# Concurrency caps for sheet analysis: per /analyze/ request and across the process
+MAX_CONCURRENT_SHEETS = int(os.getenv("MAX_CONCURRENT_SHEETS", "4"))
+GLOBAL_MAX_CONCURRENT_SHEETS = int(os.getenv("GLOBAL_MAX_CONCURRENT_SHEETS", "16"))
+
+# Per-provider limits: simultaneous in-flight calls and sustained request rate
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", "8"))
+GROQ_REQUESTS_PER_SECOND = float(os.getenv("GROQ_REQUESTS_PER_SECOND", "0.5"))
+TOGETHER_MAX_CONCURRENCY = int(os.getenv("TOGETHER_MAX_CONCURRENCY", "4"))
+TOGETHER_REQUESTS_PER_SECOND = float(os.getenv("TOGETHER_REQUESTS_PER_SECOND", "1.0"))
+
+# Background analysis jobs allowed to run at once; further submissions queue
+MAX_CONCURRENT_JOBS = int(os.getenv("MAX_CONCURRENT_JOBS", "4"))
+
+# Session progress store: "memory" (per process) or "sqlite" (shared across workers)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", "86400"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+
+# Seconds an idle SSE stream waits for a pushed event before re-reading the
+# shared store (catches updates written by other worker processes)
+SSE_RESYNC_SECONDS = float(os.getenv("SSE_RESYNC_SECONDS", "15"))
+
+# Cache for LLM stage outputs: in-memory LRU in front of an optional SQLite file
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "604800"))
+LLM_CACHE_DB_PATH = os.getenv("LLM_CACHE_DB_PATH", "llm_cache.db")  # empty disables the disk tier
+LLM_CACHE_MAX_DB_ENTRIES = int(os.getenv("LLM_CACHE_MAX_DB_ENTRIES", "100000"))
+
+# Workbook parser backend: "pandas" or "openpyxl" (streaming, .xlsx only)
+WORKBOOK_PARSER = os.getenv("WORKBOOK_PARSER", "pandas")
+
+# Uploads up to this size are parsed from memory; larger ones spill to an anonymous temp file
+MAX_UPLOAD_MEMORY_BYTES = int(os.getenv("MAX_UPLOAD_MEMORY_BYTES", str(8 * 1024 * 1024)))
+
+# Retry budget for the psychometric/judge loop; the least-bad attempt is kept once spent
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+RETRY_MAX_WALL_SECONDS = float(os.getenv("RETRY_MAX_WALL_SECONDS", "300"))
+RETRY_MAX_TOKENS = int(os.getenv("RETRY_MAX_TOKENS", "60000"))
+
+# Fall back to the LLM missing-domain check when a listed subdomain has no alias entry
+MISSING_CHECK_LLM_FALLBACK = os.getenv("MISSING_CHECK_LLM_FALLBACK", "false").lower() == "true"
+# Confirm the local missing-domain check with the LLM once it finds this many
+# missing strengths or development areas, as a false miss there forces a retry (0 disables)
+MISSING_CHECK_ESCALATE_AT = int(os.getenv("MISSING_CHECK_ESCALATE_AT", "3"))
+
+# Send only the definitions of a candidate's listed subdomains in the analysis prompts
+PROMPT_SLIMMING = os.getenv("PROMPT_SLIMMING", "true").lower() == "true"
+
+# Hedged requests: a stage's next model is tried when the current one has not
+# produced a token within the HEDGE_QUANTILE of its recent first-token latencies
+HEDGE_ENABLED = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+HEDGE_DEFAULT_DELAY_SECONDS = float(os.getenv("HEDGE_DEFAULT_DELAY_SECONDS", "10"))
+HEDGE_MIN_DELAY_SECONDS = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "1"))
+
+# Retries of a model call that fails before its first token, with exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_RETRY_BACKOFF_SECONDS = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", "1"))
+
+# Import the analysis pipeline in the background right after startup instead of on the first request
+PRELOAD_PIPELINE = os.getenv("PRELOAD_PIPELINE", "true").lower() == "true"
@@ -0,0 +1,142 @@
+# jobs.py
+import time
+import uuid
+import asyncio
+import logging
+from typing import Dict, Any, List, Tuple, Optional
+
+from session_manager import update_session_status, session_status, complete_session
+from config import MAX_CONCURRENT_JOBS
+
+# Job records live in the session store under job_key(job_id), so with a shared
+# backend (SESSION_STORE=sqlite) any worker can answer GET /jobs/{id}. They
+# follow the store's limits: a record expires SESSION_TTL_SECONDS after its last
+# update. The worker that accepted a job runs it and is the only one writing
+# its record, so each write replaces the whole record.
+JOB_KEY_PREFIX = "job:"
+
+def job_key(job_id: str) -> str:
+    """Session store key of a job's record, kept apart from its progress updates."""
+    return JOB_KEY_PREFIX + job_id
+
+async def save_job(job_id: str, job: Dict[str, Any]) -> None:
+    """Write a job's record to the session store."""
+    await session_status.aupdate(job_key(job_id), job)
+
+# Scheduler cap on jobs running at once; queued jobs wait for a slot
+job_slots = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+
+# Strong references to running job tasks so they are not garbage collected
+_job_tasks: set = set()
+
+async def submit_job(
+    pairs: List[Tuple[Dict, Dict]],
+    max_concurrency: Optional[int] = None
+) -> str:
+    """
+    Register a job for the given sheets and schedule it in the background.
+
+    Args:
+        pairs: Score/items pairs from pair_sheets
+        max_concurrency: Optional cap on sheets analyzed at once for this job
+
+    Returns:
+        The job id, which doubles as the session id for progress updates
+    """
+    job_id = uuid.uuid4().hex
+    job = {
+        "status": "queued",
+        "created": time.time(),
+        "started": None,
+        "finished": None,
+        "sheets": [sheet["sheet_name"] for sheet, _ in pairs],
+        "results": [None] * len(pairs),
+        "completed": 0,
+        "error": None,
+    }
+    await save_job(job_id, job)
+    task = asyncio.create_task(
+        run_job(job_id, job, pairs, max_concurrency)
+    )
+    _job_tasks.add(task)
+    task.add_done_callback(_job_tasks.discard)
+    return job_id
+
+async def run_job(job_id, job, pairs, max_concurrency=None) -> None:
+    """Run a queued job once a scheduler slot frees up, recording results as sheets finish."""
+
+    async def on_result(index: int, result: Dict[str, Any]) -> None:
+        job["results"][index] = result
+        job["completed"] += 1
+        await save_job(job_id, job)
+
+    async with job_slots:
+        job["status"] = "running"
+        job["started"] = time.time()
+        await save_job(job_id, job)
+        try:
+            # Imported here so the job API does not pull in the LLM stack at startup
+            from pipeline import analyze_sheets
+            await analyze_sheets(
+                pairs, job_id, max_concurrency, on_result
+            )
+            job["status"] = "completed"
+        except Exception as e:
+            logging.exception(f"Error in job {job_id}")
+            job["status"] = "failed"
+            job["error"] = str(e)
+        finally:
+            job["finished"] = time.time()
+            # The record is final before the session's event streams are told to close
+            await save_job(job_id, job)
+        if job["status"] == "completed":
+            await complete_session(job_id)
+        else:
+            await update_session_status(job_id, agent='error', status=job["error"], progress=0, name='')
+
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Summarize a job's state together with its latest progress update.
+
+    Args:
+        job_id: Job identifier returned by submit_job
+
+    Returns:
+        Job summary, or None if the job is unknown
+    """
+    job = await session_status.aget(job_key(job_id))
+    if job is None:
+        return None
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "total_sheets": len(job["sheets"]),
+        "completed_sheets": job["completed"],
+        "created": job["created"],
+        "started": job["started"],
+        "finished": job["finished"],
+        "error": job["error"],
+        "progress": await session_status.aget(job_id),
+    }
+
+async def get_job_results(job_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Return the sheet analyses finished so far, in original sheet order.
+
+    Args:
+        job_id: Job identifier returned by submit_job
+
+    Returns:
+        Finished analyses and names of pending sheets, or None if the job is unknown
+    """
+    job = await session_status.aget(job_key(job_id))
+    if job is None:
+        return None
+    return {
+        "job_id": job_id,
+        "status": job["status"],
+        "analyses": [result for result in job["results"] if result is not None],
+        "pending": [
+            name for name, result in zip(job["sheets"], job["results"]) if result is None
+        ],
+    }
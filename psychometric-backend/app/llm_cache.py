@@ -0,0 +1,189 @@
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+from config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_DB_PATH,
+    LLM_CACHE_MAX_DB_ENTRIES
+)
+
+
+class LLMCache:
+    """
+    Content-addressed cache for LLM stage outputs.
+
+    Lookups go to an in-memory LRU first and then to an optional SQLite
+    file shared across workers; disk hits are promoted into memory. Both
+    tiers drop entries older than `ttl` seconds and are bounded in size.
+
+    Disk calls can wait up to the busy timeout on another worker's write
+    lock, so async code should use aget/aset/astats, which run them in a
+    worker thread.
+    """
+
+    # Expired and excess disk rows are purged once every this many writes
+    PURGE_EVERY = 100
+
+    def __init__(self, max_entries: int, ttl: float, db_path: Optional[str] = None, max_db_entries: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_db_entries = max_db_entries
+        self.metrics = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=10)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_created ON llm_cache (created)")
+
+    @staticmethod
+    def make_key(template_id: str, prompt, inputs: Dict[str, Any], model) -> str:
+        """
+        Hash everything that determines a stage's output.
+
+        Args:
+            template_id: Name of the prompt template / stage
+            prompt: PromptTemplate the inputs are rendered into
+            inputs: Template variables
+            model: Chat model the prompt is sent to
+
+        Returns:
+            Hex digest identifying the response
+        """
+        payload = json.dumps({
+            "template": template_id,
+            "prompt": prompt.format(**inputs),
+            "model": getattr(model, "model_name", None) or getattr(model, "model", None),
+            "temperature": getattr(model, "temperature", None),
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Any:
+        """Return the cached value for `key`, or None on a miss."""
+        now = time.time()
+        value = self._memory_lookup(key, now)
+        if value is None:
+            value = self._promote(key, self._disk_lookup(key, now))
+        return value
+
+    async def aget(self, key: str) -> Any:
+        """get() without blocking the event loop on the disk tier."""
+        now = time.time()
+        value = self._memory_lookup(key, now)
+        if value is None:
+            row = await asyncio.to_thread(self._disk_lookup, key, now) if self._conn is not None else None
+            value = self._promote(key, row)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value in both tiers."""
+        now = time.time()
+        self._remember(key, now, value)
+        self.metrics["writes"] += 1
+        if self._conn is not None:
+            self._disk_write(key, value, now, self.metrics["writes"])
+
+    async def aset(self, key: str, value: Any) -> None:
+        """set() without blocking the event loop on the disk tier."""
+        now = time.time()
+        self._remember(key, now, value)
+        self.metrics["writes"] += 1
+        if self._conn is not None:
+            await asyncio.to_thread(self._disk_write, key, value, now, self.metrics["writes"])
+
+    def _memory_lookup(self, key: str, now: float) -> Any:
+        """Return a fresh memory-tier value, dropping it if expired."""
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        created, value = entry
+        if now - created > self.ttl:
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        self.metrics["memory_hits"] += 1
+        return value
+
+    def _disk_lookup(self, key: str, now: float) -> Optional[tuple]:
+        """Return the fresh (value JSON, created) row for `key` from the disk tier."""
+        if self._conn is None:
+            return None
+        with self._lock:
+            return self._conn.execute(
+                "SELECT value, created FROM llm_cache WHERE key = ? AND created >= ?",
+                (key, now - self.ttl)
+            ).fetchone()
+
+    def _promote(self, key: str, row: Optional[tuple]) -> Any:
+        """Move a disk hit into memory and count the lookup; None on a miss."""
+        if row is None:
+            self.metrics["misses"] += 1
+            return None
+        value = json.loads(row[0])
+        self._remember(key, row[1], value)
+        self.metrics["disk_hits"] += 1
+        return value
+
+    def _disk_write(self, key: str, value: Any, now: float, writes: int) -> None:
+        """Write an entry to the disk tier, purging old rows every PURGE_EVERY writes."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, created) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now)
+            )
+            if writes % self.PURGE_EVERY == 0:
+                self._conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.ttl,))
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN ("
+                    "SELECT key FROM llm_cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (self.max_db_entries,)
+                )
+
+    def _remember(self, key: str, created: float, value: Any) -> None:
+        """Put an entry in the memory tier, evicting least recently used entries."""
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.metrics["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters, hit ratio and tier sizes."""
+        lookups = self.metrics["memory_hits"] + self.metrics["disk_hits"] + self.metrics["misses"]
+        hits = lookups - self.metrics["misses"]
+        disk_size = None
+        if self._conn is not None:
+            with self._lock:
+                disk_size = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {
+            **self.metrics,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "memory_size": len(self._memory),
+            "disk_size": disk_size,
+        }
+
+    async def astats(self) -> Dict[str, Any]:
+        """stats() without blocking the event loop on the disk tier."""
+        if self._conn is not None:
+            return await asyncio.to_thread(self.stats)
+        return self.stats()
+
+
+# Shared cache instance; None when caching is disabled
+llm_cache: Optional[LLMCache] = (
+    LLMCache(LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS, LLM_CACHE_DB_PATH or None, LLM_CACHE_MAX_DB_ENTRIES)
+    if LLM_CACHE_ENABLED else None
+)
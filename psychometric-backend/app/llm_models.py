@@ -1,62 +1,124 @@
-from langchain_groq import ChatGroq
-from langchain.prompts import PromptTemplate
-from langchain_together import ChatTogether
-from config import GROQ_API_KEY, TOGETHER_API_KEY
+import asyncio
+from typing import Any, Dict, List
+from langchain_core.rate_limiters import InMemoryRateLimiter
+from config import (
+    GROQ_API_KEY,
+    TOGETHER_API_KEY,
+    GROQ_MAX_CONCURRENCY,
+    GROQ_REQUESTS_PER_SECOND,
+    TOGETHER_MAX_CONCURRENCY,
+    TOGETHER_REQUESTS_PER_SECOND
+)
 #from langchain_huggingface import HuggingFaceEndpoint
 # Importing the required chat model classes (assumed to be imported earlier)
 # from langchain.chat_models import ChatGroq, ChatTogether
 
-# Initialize the Groq model "gemma2-9b-it" with low creativity (temperature = 0.1)
-gemma = ChatGroq(
-    temperature=0.1,
-    model="gemma2-9b-it",
-    groq_api_key=GROQ_API_KEY
+# Request-rate limiters shared by every model of the same provider
+groq_rate_limiter = InMemoryRateLimiter(
+    requests_per_second=GROQ_REQUESTS_PER_SECOND,
+    max_bucket_size=GROQ_MAX_CONCURRENCY
 )
-
-# Initialize the Groq model "llama-3.3-70b-versatile" with moderate creativity
-groq_llama = ChatGroq(
-    temperature=0.2,
-    model="llama-3.3-70b-versatile",
-    groq_api_key=GROQ_API_KEY
+together_rate_limiter = InMemoryRateLimiter(
+    requests_per_second=TOGETHER_REQUESTS_PER_SECOND,
+    max_bucket_size=TOGETHER_MAX_CONCURRENCY
 )
 
-# Initialize the Groq model "deepseek-r1-distill-qwen-32b" for efficient reasoning tasks
-groq_r1_qwen = ChatGroq(
-    temperature=0.2,
-    model="deepseek-r1-distill-qwen-32b",
-    groq_api_key=GROQ_API_KEY
-)
+# Caps on simultaneous in-flight calls per provider
+provider_slots = {
+    "groq": asyncio.Semaphore(GROQ_MAX_CONCURRENCY),
+    "together": asyncio.Semaphore(TOGETHER_MAX_CONCURRENCY),
+}
 
-# Initialize the Groq model "deepseek-r1-distill-llama-70b" with balanced creativity
-groq_r1_llama = ChatGroq(
-    temperature=0.2,
-    model="deepseek-r1-distill-llama-70b",
-    groq_api_key=GROQ_API_KEY
-)
+def provider_name(model) -> str:
+    """Return the provider hosting `model`."""
+    return _providers.get(id(model), "together")
 
-# Initialize another Groq-hosted model "qwen-2.5-32b" with moderate temperature
-groq_qwen = ChatGroq(
-    temperature=0.2,
-    model="qwen-2.5-32b",
-    groq_api_key=GROQ_API_KEY
-)
+def provider_slot(model) -> asyncio.Semaphore:
+    """Return the concurrency semaphore for the provider hosting `model`."""
+    return provider_slots[provider_name(model)]
 
-# Initialize a Together-hosted LLaMA 4 Maverick model, 17B version, with retry logic
-llama_maverick_70b_together = ChatTogether(
-    together_api_key=TOGETHER_API_KEY,
-    model="meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
-    temperature=0.2,
-    max_tokens=None,     # Let the model decide max tokens
-    timeout=None,        # No timeout restriction
-    max_retries=2        # Retry twice in case of failure
-)
+# Constructor settings of every model by name. Clients are only built on
+# first use, so importing this module never loads the provider SDKs.
+MODEL_SPECS = {
+    # Groq model "gemma2-9b-it" with low creativity (temperature = 0.1)
+    "gemma": ("groq", dict(
+        temperature=0.1,
+        model="gemma2-9b-it"
+    )),
+    # Groq model "llama-3.3-70b-versatile" with moderate creativity
+    "groq_llama": ("groq", dict(
+        temperature=0.2,
+        model="llama-3.3-70b-versatile"
+    )),
+    # Groq model "deepseek-r1-distill-qwen-32b" for efficient reasoning tasks
+    "groq_r1_qwen": ("groq", dict(
+        temperature=0.2,
+        model="deepseek-r1-distill-qwen-32b"
+    )),
+    # Groq model "deepseek-r1-distill-llama-70b" with balanced creativity
+    "groq_r1_llama": ("groq", dict(
+        temperature=0.2,
+        model="deepseek-r1-distill-llama-70b"
+    )),
+    # Another Groq-hosted model "qwen-2.5-32b" with moderate temperature
+    "groq_qwen": ("groq", dict(
+        temperature=0.2,
+        model="qwen-2.5-32b"
+    )),
+    # Together-hosted LLaMA 4 Maverick model, 17B version
+    "llama_maverick_70b_together": ("together", dict(
+        model="meta-llama/Llama-4-Maverick-17B-128E-Instruct-FP8",
+        temperature=0.2,
+        max_tokens=None,     # Let the model decide max tokens
+        timeout=None,        # No timeout restriction
+        stream_usage=True    # Report token usage on streamed responses too
+    )),
+    # Free Together-hosted LLaMA 3.3 70B model for low-cost usage
+    "llama_70b_together_free": ("together", dict(
+        model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
+        temperature=0.2,
+        max_tokens=None,
+        timeout=None,
+        stream_usage=True
+    )),
+}
 
-# Initialize a free Together-hosted LLaMA 3.3 70B model for low-cost usage
-llama_70b_together_free = ChatTogether(
-    together_api_key=TOGETHER_API_KEY,
-    model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
-    temperature=0.2,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2
-)
+_models: Dict[str, Any] = {}
+_providers: Dict[int, str] = {}
+
+def get_model(name: str):
+    """Return the chat model registered under `name`, constructing it on first use."""
+    model = _models.get(name)
+    if model is None:
+        provider, settings = MODEL_SPECS[name]
+        # Failed calls are retried (and counted) by routing.run_attempt, not by the SDKs
+        if provider == "groq":
+            from langchain_groq import ChatGroq
+            model = ChatGroq(**settings, max_retries=0, groq_api_key=GROQ_API_KEY, rate_limiter=groq_rate_limiter)
+        else:
+            from langchain_together import ChatTogether
+            model = ChatTogether(**settings, max_retries=0, together_api_key=TOGETHER_API_KEY, rate_limiter=together_rate_limiter)
+        _models[name] = model
+        _providers[id(model)] = provider
+    return model
+
+def __getattr__(name: str):
+    # Keeps `from llm_models import groq_llama` working through the lazy registry
+    if name in MODEL_SPECS:
+        return get_model(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# Candidate models per stage, in order of preference. The first is the primary;
+# the rest serve as hedges and as failover targets when a call errors.
+STAGE_ROUTES = {
+    "psychometric_analysis": ["llama_70b_together_free", "groq_llama", "llama_maverick_70b_together"],
+    "missing_domains": ["groq_r1_llama", "groq_llama"],
+    "judge_analysis": ["llama_70b_together_free", "groq_llama", "groq_qwen"],
+    "correlated_analysis": ["groq_r1_llama", "llama_maverick_70b_together"],
+    "item_analysis": ["llama_70b_together_free", "groq_llama", "llama_maverick_70b_together"],
+    "format_analysis": ["llama_70b_together_free", "groq_llama", "groq_qwen"],
+}
+
+def stage_models(stage: str) -> List[Any]:
+    """Return the candidate models of a stage, primary first."""
+    return [get_model(name) for name in STAGE_ROUTES[stage]]
@@ -4,22 +4,45 @@ import time
 import json
 import asyncio
 import logging
-from typing import Dict, Any
+import tempfile
+import importlib
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List
 
 from fastapi import FastAPI, UploadFile, File, Form, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from sse_starlette.sse import EventSourceResponse
 
-from agent import analyze_psychometric_scores
-from utils import extract_score, extract_items, filter_subdomain
+from jobs import submit_job, get_job, get_job_results
 from socket_manager import socket_app, sio
-from session_manager import update_session_status, session_status
+from session_manager import update_session_status, session_status, subscribe, unsubscribe, complete_session, is_session_final
+from llm_cache import llm_cache
+from metrics import render_metrics, session_breakdown
+from config import SSE_RESYNC_SECONDS, MAX_UPLOAD_MEMORY_BYTES, PRELOAD_PIPELINE
+
+# The analysis pipeline (langgraph, langchain, provider SDKs, pandas) is imported
+# on first use, so the server starts accepting connections without it
+HEAVY_MODULES = ("pipeline", "screening")
+
+def preload_heavy_modules():
+    for module in HEAVY_MODULES:
+        importlib.import_module(module)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the heavy imports in a worker thread without holding up startup
+    if PRELOAD_PIPELINE:
+        asyncio.get_running_loop().run_in_executor(None, preload_heavy_modules)
+    yield
 
 # Initialize FastAPI app and mount Socket.IO
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 app.mount('/socket.io', socket_app)
 
+# Size of the chunks uploads are copied in
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -29,15 +52,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def validate_uploads(scores_file: UploadFile, items_file: UploadFile):
+    """Return a 400 response if either upload is not an Excel workbook, else None."""
+    allowed_ext = {'.xlsx', '.xls'}
+    s_ext = os.path.splitext(scores_file.filename)[1].lower()
+    i_ext = os.path.splitext(items_file.filename)[1].lower()
+    if s_ext not in allowed_ext:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Invalid scores file format: {s_ext}", "status": "failed"}
+        )
+    if i_ext not in allowed_ext:
+        return JSONResponse(
+            status_code=400,
+            content={"error": f"Invalid items file format: {i_ext}", "status": "failed"}
+        )
+    return None
+
+async def buffer_upload(upload: UploadFile) -> tempfile.SpooledTemporaryFile:
+    """
+    Copy an upload into a private buffer that stays in memory up to
+    MAX_UPLOAD_MEMORY_BYTES and spills to an anonymous temp file beyond that.
+    """
+    buffer = tempfile.SpooledTemporaryFile(max_size=MAX_UPLOAD_MEMORY_BYTES)
+    while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+        buffer.write(chunk)
+    buffer.seek(0)
+    return buffer
+
+async def parse_uploads(scores_file: UploadFile, items_file: UploadFile):
+    """
+    Parse the scores and items workbooks of a request.
+
+    Each request gets its own buffers, so concurrent uploads never share
+    files, and parsing runs in a worker thread to keep the event loop free.
+
+    Returns:
+        Tuple of (scores_data, items_data)
+    """
+    from utils import extract_score, extract_items
+    with await buffer_upload(scores_file) as scores_buffer, await buffer_upload(items_file) as items_buffer:
+        scores_data = await asyncio.to_thread(extract_score, scores_buffer)
+        items_data = await asyncio.to_thread(extract_items, items_buffer)
+    return scores_data, items_data
+
 @app.post("/analyze/")
 async def analyze_psychometric(
     scores_file: UploadFile = File(...),
     items_file: UploadFile = File(...),
-    session_id: str = Form(None)
+    session_id: str = Form(None),
+    max_concurrency: int = Form(None)
 ) -> Dict[str, Any]:
     """
     Analyze psychometric scores and items from uploaded Excel files
     """
+    from pipeline import pair_sheets, analyze_sheets, sheet_mismatch_error
     try:
         # Generate a new session_id if not provided
         if not session_id:
@@ -56,96 +125,25 @@ async def analyze_psychometric(
         # )
 
         # Validate file extensions
-        allowed_ext = {'.xlsx', '.xls'}
-        s_ext = os.path.splitext(scores_file.filename)[1].lower()
-        i_ext = os.path.splitext(items_file.filename)[1].lower()
-        if s_ext not in allowed_ext:
-            return JSONResponse(
-                status_code=400,
-                content={"error": f"Invalid scores file format: {s_ext}", "status": "failed"}
-            )
-        if i_ext not in allowed_ext:
+        invalid = validate_uploads(scores_file, items_file)
+        if invalid:
+            return invalid
+
+        # Parse uploads straight from memory
+        scores_data, items_data = await parse_uploads(scores_file, items_file)
+
+        # Pair every score sheet with its items before any LLM work starts
+        pairs, missing, extra, duplicate_scores, duplicate_items = pair_sheets(scores_data, items_data)
+        if missing or duplicate_scores or duplicate_items:
             return JSONResponse(
                 status_code=400,
-                content={"error": f"Invalid items file format: {i_ext}", "status": "failed"}
+                content=sheet_mismatch_error(missing, extra, duplicate_scores, duplicate_items)
             )
+        if extra:
+            logging.warning(f"Items sheets without scores ignored: {extra}")
 
-        # Save uploads
-        scores_path = 'temp_scores.xlsx'
-        items_path = 'temp_items.xlsx'
-        with open(scores_path, 'wb') as f:
-            f.write(await scores_file.read())
-        with open(items_path, 'wb') as f:
-            f.write(await items_file.read())
-
-        # Extract data
-        scores_data = extract_score(scores_path)
-        items_data, response_bias, high_response_bias = extract_items(items_path)
-
-        all_analyses = []
-        # Iterate sheets and analyze
-        for sheet in scores_data:
-            match = next(
-                (itm for itm in items_data if itm['sheet_name'] == sheet['sheet_name']),
-                None
-            )
-            if not match:
-                os.remove(scores_path)
-                os.remove(items_path)
-                return JSONResponse(
-                    status_code=400,
-                    content={
-                        "error": f"No matching items for sheet '{sheet['sheet_name']}'",
-                        "status": "failed"
-                    }
-                )
-
-            # Check for high bias levels
-            if high_response_bias:
-                all_analyses.append({
-                    "sheet_name": sheet["sheet_name"],
-                    "analysis":{"Psychometric Analysis": "The individual seems to have taken the test carefully, possibly to conceal certain aspects of themselves. The scores may not accurately reflect their traits and skills. Assessment during the interview is recommended.",
-                                "Item Analysis" : ""
-                                } ,
-                })
-                continue
-            
-            # Filter subdomains into strengths and development areas
-            filtered, social_desirable, high_social_desireable = filter_subdomain(sheet["data"])
-            
-            # Check for high social desirability
-            if high_social_desireable:
-                all_analyses.append({
-                    "sheet_name": sheet["sheet_name"],
-                    "analysis": {"Psychometric Analysis": "According to the test scores, the candidate seems to have a tendency to appear in a desirable way. Due to this factor of social desirability, her test scores may not be interpreted as accurate presentation of her skills.",
-                                 "Item Analysis" : ""   
-                    },
-                })
-                continue
-
-            # Call agent for full analysis
-            agent_input = {
-                'scores': {
-                    'strength': filtered['Strengths'],
-                    'development_area': filtered['Development areas']
-                },
-                'items': match,
-                'metadata': {
-                    'response_bias': response_bias,
-                    'social_desirable': social_desirable
-                },
-                'name': sheet['sheet_name'],
-            }
-
-            result = await analyze_psychometric_scores(agent_input, session_id)
-            all_analyses.append({
-                'sheet_name': sheet['sheet_name'],
-                'analysis': result
-            })
-
-        # Cleanup
-        os.remove(scores_path)
-        os.remove(items_path)
+        all_analyses = await analyze_sheets(pairs, session_id, max_concurrency)
+        await complete_session(session_id)
 
         return {'analyses': all_analyses}
 
@@ -163,6 +161,99 @@ async def analyze_psychometric(
             content={"error": str(e), "status": "failed"}
         )
 
+@app.post("/jobs")
+async def create_job(
+    scores_file: UploadFile = File(...),
+    items_file: UploadFile = File(...),
+    max_concurrency: int = Form(None)
+):
+    """
+    Parse uploaded workbooks and queue their analysis as a background job
+    """
+    from pipeline import pair_sheets, sheet_mismatch_error
+    invalid = validate_uploads(scores_file, items_file)
+    if invalid:
+        return invalid
+
+    try:
+        scores_data, items_data = await parse_uploads(scores_file, items_file)
+    except Exception as e:
+        logging.exception('Error in /jobs')
+        return JSONResponse(status_code=400, content={"error": str(e), "status": "failed"})
+
+    pairs, missing, extra, duplicate_scores, duplicate_items = pair_sheets(scores_data, items_data)
+    if missing or duplicate_scores or duplicate_items:
+        return JSONResponse(
+            status_code=400,
+            content=sheet_mismatch_error(missing, extra, duplicate_scores, duplicate_items)
+        )
+    if extra:
+        logging.warning(f"Items sheets without scores ignored: {extra}")
+
+    job_id = await submit_job(pairs, max_concurrency)
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "total_sheets": len(pairs)}
+    )
+
+@app.post("/screen")
+async def screen(
+    scores_files: List[UploadFile] = File(...),
+    items_files: List[UploadFile] = File(None)
+):
+    """
+    Triage every candidate of one or more workbooks without any LLM call.
+    Items workbooks, when given, pair with the scores workbooks by position.
+    """
+    from screening import screen_workbooks
+    items_files = items_files or []
+    if items_files and len(items_files) != len(scores_files):
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Provide one items file per scores file, or none", "status": "failed"}
+        )
+    allowed_ext = {'.xlsx', '.xls'}
+    for upload in [*scores_files, *items_files]:
+        ext = os.path.splitext(upload.filename)[1].lower()
+        if ext not in allowed_ext:
+            return JSONResponse(
+                status_code=400,
+                content={"error": f"Invalid file format: {upload.filename}", "status": "failed"}
+            )
+
+    buffers = []
+    try:
+        workbooks = []
+        for index, scores_file in enumerate(scores_files):
+            scores_buffer = await buffer_upload(scores_file)
+            buffers.append(scores_buffer)
+            items_buffer = None
+            if items_files:
+                items_buffer = await buffer_upload(items_files[index])
+                buffers.append(items_buffer)
+            workbooks.append((scores_file.filename, scores_buffer, items_buffer))
+        return await asyncio.to_thread(screen_workbooks, workbooks)
+    except Exception as e:
+        logging.exception('Error in /screen')
+        return JSONResponse(status_code=400, content={"error": str(e), "status": "failed"})
+    finally:
+        for buffer in buffers:
+            buffer.close()
+
+@app.get('/jobs/{job_id}')
+async def job_status(job_id: str):
+    job = await get_job(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"Unknown job '{job_id}'", "status": "failed"})
+    return job
+
+@app.get('/jobs/{job_id}/results')
+async def job_results(job_id: str):
+    results = await get_job_results(job_id)
+    if results is None:
+        return JSONResponse(status_code=404, content={"error": f"Unknown job '{job_id}'", "status": "failed"})
+    return results
+
 # Health & utility endpoints
 @app.get('/')
 async def root():
@@ -173,11 +264,24 @@ async def root():
 
 @app.get('/status/{session_id}')
 async def get_status(session_id: str):
-    info = session_status.get(session_id)
+    info = await session_status.aget(session_id)
     if info:
-        return {'session_id': session_id, **info}
+        timings = session_breakdown(session_id)
+        return {'session_id': session_id, **info, **({'timings': timings} if timings else {})}
     return {'session_id': session_id, 'status': 'unknown', 'progress': 0}
 
+@app.get('/sessions/stats')
+async def session_store_stats():
+    return await session_status.astats()
+
+@app.get('/cache/stats')
+async def llm_cache_stats():
+    return await llm_cache.astats() if llm_cache is not None else {'enabled': False}
+
+@app.get('/metrics')
+async def prometheus_metrics():
+    return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4')
+
 @app.get('/events/{session_id}')
 async def sse_events(session_id: str, response: Response):
     # SSE setup
@@ -189,21 +293,31 @@ async def sse_events(session_id: str, response: Response):
     })
     async def generator():
         last_ts = 0
-        while True:
-            await asyncio.sleep(1)
-            data = session_status.get(session_id)
-            if not data:
-                continue
-            if data['timestamp'] > last_ts:
-                last_ts = data['timestamp']
-                event_data = {'session_id': session_id, **data}
-                print(f"Sending SSE event: {event_data}")  # Debug log
-                yield {'event': 'update', 'data': json.dumps(event_data)}
-            if data.get('progress', 0) >= 100:
-                break
+        queue = subscribe(session_id)
+        try:
+            data = await session_status.aget(session_id)
+            while True:
+                # Streamed tokens/results are always forwarded; status records only when newer
+                if data and ('kind' in data or data['timestamp'] > last_ts):
+                    last_ts = max(last_ts, data['timestamp'])
+                    event_data = {'session_id': session_id, **data}
+                    if 'kind' not in data:
+                        print(f"Sending SSE event: {event_data}")  # Debug log
+                    yield {'event': data.get('kind', 'update'), 'data': json.dumps(event_data)}
+                    # Sheets reach 100 one by one; only the session-level update ends the stream
+                    if is_session_final(data):
+                        break
+                # Sleep until an update is pushed; on timeout re-read the store,
+                # which picks up updates written by other workers
+                try:
+                    data = await asyncio.wait_for(queue.get(), timeout=SSE_RESYNC_SECONDS)
+                except asyncio.TimeoutError:
+                    data = await session_status.aget(session_id)
+        finally:
+            unsubscribe(session_id, queue)
     return EventSourceResponse(generator())
 
 @app.get('/test-socket/{session_id}')
 async def test_socket(session_id: str):
-    await sio.emit('agent_update', {'session_id': session_id, 'agent': 'test', 'status': 'Hello', 'progress': 50})
+    await sio.emit('agent_update', {'session_id': session_id, 'agent': 'test', 'status': 'Hello', 'progress': 50}, room=session_id)
     return {'message': f'Test event sent to {session_id}'}
@@ -0,0 +1,226 @@
+import time
+import asyncio
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Any, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+
+from config import SESSION_MAX_ENTRIES
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+TOKEN_BUCKETS = (64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+ITERATION_BUCKETS = (1, 2, 3, 4, 5, 10)
+
+
+def format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    """Prometheus-style counter keyed by label values."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = defaultdict(float)
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self.values[label_values] += amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, total in sorted(self.values.items()):
+            lines.append(f"{self.name}{format_labels(self.labels, values)} {total}")
+        return lines
+
+
+class Histogram:
+    """Prometheus-style histogram with cumulative buckets, keyed by label values."""
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [per-bucket counts (+Inf last), sum, count]
+        self.values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        entry = self.values.setdefault(label_values, [[0] * (len(self.buckets) + 1), 0.0, 0])
+        entry[0][bisect_left(self.buckets, value)] += 1
+        entry[1] += value
+        entry[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total, count) in sorted(self.values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(list(self.buckets) + ["+Inf"], counts):
+                cumulative += bucket_count
+                bucket_labels = format_labels(self.labels, values, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, values)} {total}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, values)} {count}")
+        return lines
+
+
+node_duration = Histogram("psychometric_node_duration_seconds", "Wall time of LangGraph nodes", ("node",))
+llm_duration = Histogram("psychometric_llm_call_duration_seconds", "Wall time of LLM calls, including rate limiter waits", ("model", "node"))
+llm_queue_wait = Histogram("psychometric_llm_queue_wait_seconds", "Time spent waiting for a provider concurrency slot", ("provider",))
+llm_prompt_tokens = Histogram("psychometric_llm_prompt_tokens", "Prompt tokens per LLM call", ("model",), TOKEN_BUCKETS)
+llm_completion_tokens = Histogram("psychometric_llm_completion_tokens", "Completion tokens per LLM call", ("model",), TOKEN_BUCKETS)
+llm_errors = Counter("psychometric_llm_errors_total", "LLM calls that raised", ("model",))
+llm_retries = Counter("psychometric_llm_retries_total", "LLM calls retried on the same model after an error", ("model",))
+llm_hedges = Counter("psychometric_llm_hedges_total", "Hedge requests sent to an alternate model", ("model",))
+llm_failovers = Counter("psychometric_llm_failovers_total", "Calls retried on an alternate model after an error", ("model",))
+retry_loop_iterations = Histogram("psychometric_retry_loop_iterations", "Psychometric analysis attempts per sheet", (), ITERATION_BUCKETS)
+retry_budget_exhausted = Counter("psychometric_retry_budget_exhausted_total", "Sheets that spent the whole retry budget")
+
+REGISTRY = [
+    node_duration, llm_duration, llm_queue_wait, llm_prompt_tokens, llm_completion_tokens,
+    llm_errors, llm_retries, llm_hedges, llm_failovers, retry_loop_iterations, retry_budget_exhausted,
+]
+
+
+def render_metrics() -> str:
+    """Render every metric in the Prometheus text exposition format."""
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# Per-session timing breakdowns, most recently updated last
+_sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def session_entry(session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    if not session_id:
+        return None
+    entry = _sessions.get(session_id)
+    if entry is None:
+        entry = _sessions[session_id] = {
+            "nodes": {},
+            "llm": {},
+            "queue_wait_seconds": 0.0,
+            "retry_iterations": 0,
+        }
+        if len(_sessions) > SESSION_MAX_ENTRIES:
+            _sessions.popitem(last=False)
+    _sessions.move_to_end(session_id)
+    return entry
+
+
+def session_breakdown(session_id: str) -> Optional[Dict[str, Any]]:
+    """Per-node and per-model timing and token totals recorded for a session."""
+    return _sessions.get(session_id)
+
+
+def record_queue_wait(provider: str, seconds: float, session_id: Optional[str] = None) -> None:
+    llm_queue_wait.observe(seconds, provider)
+    entry = session_entry(session_id)
+    if entry is not None:
+        entry["queue_wait_seconds"] += seconds
+
+
+def record_llm_retry(model: str, session_id: Optional[str] = None) -> None:
+    llm_retries.inc(model)
+    entry = session_entry(session_id)
+    if entry is not None:
+        add_totals(entry["llm"], model, retries=1)
+
+
+def record_retry_loop(session_id: str, iterations: int, exhausted: bool) -> None:
+    retry_loop_iterations.observe(iterations)
+    if exhausted:
+        retry_budget_exhausted.inc()
+    entry = session_entry(session_id)
+    if entry is not None:
+        entry["retry_iterations"] += iterations
+
+
+def add_totals(totals: Dict[str, Dict[str, float]], key: str, **amounts: float) -> None:
+    bucket = totals.setdefault(key, defaultdict(int))
+    for field, amount in amounts.items():
+        bucket[field] += amount
+
+
+class MetricsCallbackHandler(AsyncCallbackHandler):
+    """
+    Records LangGraph node and chat model runs into the metrics above.
+
+    Attach it as a graph-level callback; child runs inherit it, and the
+    session is read from the run metadata ("session_id").
+    """
+
+    def __init__(self):
+        self._runs: Dict[UUID, Tuple[float, str, Optional[str], str]] = {}
+
+    async def on_chain_start(self, serialized, inputs, *, run_id, metadata=None, **kwargs) -> None:
+        metadata = metadata or {}
+        # Only the node runnable itself is named after the node, not the chains it calls
+        node = metadata.get("langgraph_node")
+        if node and kwargs.get("name") == node:
+            self._runs[run_id] = (time.perf_counter(), node, metadata.get("session_id"), "node")
+
+    async def on_chain_end(self, outputs, *, run_id, **kwargs) -> None:
+        self._finish_node(run_id)
+
+    async def on_chain_error(self, error, *, run_id, **kwargs) -> None:
+        self._finish_node(run_id)
+
+    def _finish_node(self, run_id: UUID) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        start, node, session_id, _ = run
+        seconds = time.perf_counter() - start
+        node_duration.observe(seconds, node)
+        entry = session_entry(session_id)
+        if entry is not None:
+            add_totals(entry["nodes"], node, calls=1, seconds=seconds)
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id, metadata=None, **kwargs) -> None:
+        metadata = metadata or {}
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or kwargs.get("name") or "unknown"
+        self._runs[run_id] = (time.perf_counter(), metadata.get("langgraph_node", ""), metadata.get("session_id"), model)
+
+    async def on_llm_end(self, response, *, run_id, **kwargs) -> None:
+        run = self._runs.pop(run_id, None)
+        if run is None:
+            return
+        start, node, session_id, model = run
+        seconds = time.perf_counter() - start
+        usage = {}
+        message = getattr(response.generations[0][0], "message", None) if response.generations else None
+        if message is not None and getattr(message, "usage_metadata", None):
+            usage = message.usage_metadata
+        prompt_tokens = usage.get("input_tokens", 0)
+        completion_tokens = usage.get("output_tokens", 0)
+        llm_duration.observe(seconds, model, node)
+        llm_prompt_tokens.observe(prompt_tokens, model)
+        llm_completion_tokens.observe(completion_tokens, model)
+        entry = session_entry(session_id)
+        if entry is not None:
+            add_totals(
+                entry["llm"], model, calls=1, seconds=seconds,
+                prompt_tokens=prompt_tokens, completion_tokens=completion_tokens
+            )
+
+    async def on_llm_error(self, error, *, run_id, **kwargs) -> None:
+        run = self._runs.pop(run_id, None)
+        # Hedges abandoned by the router are cancelled, not failed
+        if run is None or isinstance(error, asyncio.CancelledError):
+            return
+        _, _, session_id, model = run
+        llm_errors.inc(model)
+        entry = session_entry(session_id)
+        if entry is not None:
+            add_totals(entry["llm"], model, errors=1)
+
+
+metrics_handler = MetricsCallbackHandler()
@@ -0,0 +1,165 @@
+# pipeline.py
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from agent import analyze_psychometric_scores
+from utils import filter_subdomain, normalize_sheet_name, duplicate_sheets
+from scoring import HIGH_RESPONSE_BIAS_ANALYSIS, HIGH_SOCIAL_DESIRABILITY_ANALYSIS
+from config import MAX_CONCURRENT_SHEETS, GLOBAL_MAX_CONCURRENT_SHEETS
+
+# Process-wide cap on sheets analyzed at once, shared by all requests
+analysis_slots = asyncio.Semaphore(GLOBAL_MAX_CONCURRENT_SHEETS)
+
+async def analyze_sheet(sheet, match, session_id):
+    """
+    Analyze a single score sheet with its matching items.
+
+    Args:
+        sheet: Score sheet record from extract_score
+        match: Items record for the same sheet from extract_items, carrying
+            that sheet's response bias flags
+        session_id: Session used for progress updates
+
+    Returns:
+        Dictionary with the sheet name and its analysis
+    """
+    # Check for high bias levels
+    if match['high_response_bias']:
+        return {
+            "sheet_name": sheet["sheet_name"],
+            "analysis":{"Psychometric Analysis": HIGH_RESPONSE_BIAS_ANALYSIS,
+                        "Item Analysis" : ""
+                        } ,
+        }
+
+    # Filter subdomains into strengths and development areas
+    filtered, social_desirable, high_social_desireable = filter_subdomain(sheet["data"])
+
+    # Check for high social desirability
+    if high_social_desireable:
+        return {
+            "sheet_name": sheet["sheet_name"],
+            "analysis": {"Psychometric Analysis": HIGH_SOCIAL_DESIRABILITY_ANALYSIS,
+                         "Item Analysis" : ""
+            },
+        }
+
+    # Call agent for full analysis
+    agent_input = {
+        'scores': {
+            'strength': filtered['Strengths'],
+            'development_area': filtered['Development areas']
+        },
+        'items': {'sheet_name': match['sheet_name'], 'data': match['data']},
+        'metadata': {
+            'response_bias': match['response_bias'],
+            'social_desirable': social_desirable
+        },
+        'name': sheet['sheet_name'],
+    }
+
+    result = await analyze_psychometric_scores(agent_input, session_id)
+    return {
+        'sheet_name': sheet['sheet_name'],
+        'analysis': result
+    }
+
+def pair_sheets(scores_data, items_index) -> Tuple[List[Tuple[Dict, Dict]], List[str], List[str], List[List[str]], List[List[str]]]:
+    """
+    Pair every score sheet with its items sheet in one validation pass.
+
+    Args:
+        scores_data: Sheet records from extract_score
+        items_index: Items records from extract_items, keyed by normalized sheet name
+
+    Returns:
+        Tuple of (score/items pairs, score sheets without items, items sheets
+        without scores, groups of score sheets whose names collide, groups of
+        items sheets whose names collide)
+    """
+    pairs, missing, matched = [], [], set()
+    score_names: Dict[str, List[str]] = {}
+    for sheet in scores_data:
+        key = normalize_sheet_name(sheet['sheet_name'])
+        score_names.setdefault(key, []).append(sheet['sheet_name'])
+        match = items_index.get(key)
+        if match:
+            pairs.append((sheet, match))
+            matched.add(key)
+        else:
+            missing.append(sheet['sheet_name'])
+    extra = [record['sheet_name'] for key, record in items_index.items() if key not in matched]
+    # Score sheets differing only in case or spacing would share one items sheet
+    duplicate_scores = [names for names in score_names.values() if len(names) > 1]
+    return pairs, missing, extra, duplicate_scores, duplicate_sheets(items_index)
+
+def sheet_mismatch_error(
+    missing: List[str],
+    extra: List[str],
+    duplicate_scores: List[List[str]] = (),
+    duplicate_items: List[List[str]] = ()
+) -> Dict[str, Any]:
+    """
+    Error body listing every score sheet without items, every unused items
+    sheet and every group of score or items sheets with colliding names.
+    """
+    def collisions(groups):
+        return "; ".join(" vs ".join(repr(name) for name in group) for group in groups)
+
+    problems = []
+    if missing:
+        problems.append(f"No matching items for sheets: {', '.join(repr(name) for name in missing)}")
+    if duplicate_scores:
+        problems.append(f"Score sheet names collide: {collisions(duplicate_scores)}")
+    if duplicate_items:
+        problems.append(f"Items sheet names collide: {collisions(duplicate_items)}")
+    return {
+        "error": ". ".join(problems),
+        "missing_items": missing,
+        "unmatched_items": extra,
+        "duplicate_scores": list(duplicate_scores),
+        "duplicate_items": list(duplicate_items),
+        "status": "failed"
+    }
+
+async def analyze_sheets(
+    pairs: List[Tuple[Dict, Dict]],
+    session_id: str,
+    max_concurrency: Optional[int] = None,
+    on_result: Optional[Callable[[int, Dict[str, Any]], Awaitable[None]]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Analyze paired sheets concurrently, bounded per call and across the process.
+
+    Args:
+        pairs: Score/items pairs from pair_sheets
+        session_id: Session used for progress updates
+        max_concurrency: Optional lower cap on sheets analyzed at once for this call
+        on_result: Optional async callback awaited with (index, result) as each sheet finishes
+
+    Returns:
+        Sheet analyses in the original sheet order
+    """
+    limit = min(max_concurrency or MAX_CONCURRENT_SHEETS, MAX_CONCURRENT_SHEETS)
+    request_slots = asyncio.Semaphore(max(limit, 1))
+
+    async def run_sheet(index, sheet, match):
+        async with request_slots, analysis_slots:
+            result = await analyze_sheet(sheet, match, session_id)
+        if on_result:
+            await on_result(index, result)
+        return result
+
+    tasks = [
+        asyncio.create_task(run_sheet(index, sheet, match))
+        for index, (sheet, match) in enumerate(pairs)
+    ]
+    try:
+        # gather keeps results in original sheet order
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        # One failed sheet fails the request, so stop the rest from spending LLM calls
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
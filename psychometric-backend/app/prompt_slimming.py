@@ -0,0 +1,141 @@
+import re
+from typing import Dict, List, Any, Iterable, Optional, Tuple
+from langchain.prompts import PromptTemplate
+
+from prompt_templates import (
+    psychometric_analysis_prompt,
+    corelated_domain_together_prompt,
+    item_analysis_2_prompt
+)
+from checks import normalize_domain
+
+DEFINITIONS_HEADING = "### Domain Definitions\n"
+DOMAIN_PATTERN = re.compile(r"^\s*\*\*[^*]+\*\*\s*$")
+SUBDOMAIN_PATTERN = re.compile(r"^\s*- \*\*([^*]+)\*\*")
+
+# Rough characters-per-token ratio used for the slimming report
+CHARS_PER_TOKEN = 4
+
+
+class DomainDefinitions:
+    """
+    The "### Domain Definitions" block of a prompt, split into one fragment per
+    subdomain so it can be re-rendered for just the subdomains of a profile.
+    Rendering every subdomain reproduces the original block exactly.
+    """
+
+    def __init__(self, text: str):
+        # [(domain header, [(normalized subdomain name, fragment)])]
+        self.domains: List[Tuple[str, List[Tuple[str, str]]]] = []
+        for line in text.splitlines(keepends=True):
+            subdomain = SUBDOMAIN_PATTERN.match(line)
+            if DOMAIN_PATTERN.match(line):
+                self.domains.append((line, []))
+            elif subdomain:
+                self.domains[-1][1].append((normalize_domain(subdomain.group(1)), line))
+            else:
+                name, fragment = self.domains[-1][1][-1]
+                self.domains[-1][1][-1] = (name, fragment + line)
+
+    @property
+    def names(self) -> List[str]:
+        return [name for _, subdomains in self.domains for name, _ in subdomains]
+
+    def render(self, names: Optional[Iterable[str]] = None) -> str:
+        """
+        Render the definitions of the given subdomains under their domain headers.
+
+        Args:
+            names: Subdomain names as they appear in the scores; None renders all
+
+        Returns:
+            Definitions text. Falls back to the full block when a name has no
+            fragment, so the model never loses a definition it needs.
+        """
+        if names is None:
+            selected = set(self.names)
+        else:
+            selected = {normalize_domain(name) for name in names}
+            if not selected.issubset(self.names):
+                selected = set(self.names)
+        return "".join(
+            header + "".join(fragment for name, fragment in subdomains if name in selected)
+            for header, subdomains in self.domains
+            if any(name in selected for name, _ in subdomains)
+        )
+
+
+def definitions_span(template: str) -> Tuple[int, int]:
+    """Character span of the definitions block, from the heading to the last definition line."""
+    start = template.index(DEFINITIONS_HEADING) + len(DEFINITIONS_HEADING)
+    end = start
+    for line in template[start:].splitlines(keepends=True):
+        if line.strip() and not (
+            DOMAIN_PATTERN.match(line) or SUBDOMAIN_PATTERN.match(line) or line.startswith("      ")
+        ):
+            break
+        end += len(line)
+    # Blank lines after the last definition stay part of the surrounding template
+    block = template[start:end]
+    return start, start + len(block.rstrip("\n ")) + 1
+
+
+def slim_prompt(prompt: PromptTemplate) -> Tuple[PromptTemplate, DomainDefinitions]:
+    """
+    Turn a prompt's definitions block into a {domain_definitions} variable.
+
+    Args:
+        prompt: Prompt embedding the full "### Domain Definitions" block
+
+    Returns:
+        Tuple of (prompt taking domain_definitions, the parsed definitions)
+    """
+    start, end = definitions_span(prompt.template)
+    slim = PromptTemplate(
+        template=prompt.template[:start] + "{domain_definitions}" + prompt.template[end:],
+        input_variables=prompt.input_variables + ["domain_definitions"],
+        partial_variables=prompt.partial_variables,
+    )
+    return slim, DomainDefinitions(prompt.template[start:end])
+
+
+psychometric_analysis_slim_prompt, psychometric_definitions = slim_prompt(psychometric_analysis_prompt)
+item_analysis_2_slim_prompt, item_analysis_definitions = slim_prompt(item_analysis_2_prompt)
+corelated_domain_slim_prompt, corelated_domain_definitions = slim_prompt(corelated_domain_together_prompt)
+
+SLIM_STAGES = {
+    "psychometric_analysis": (psychometric_analysis_prompt, psychometric_analysis_slim_prompt, psychometric_definitions),
+    "item_analysis": (item_analysis_2_prompt, item_analysis_2_slim_prompt, item_analysis_definitions),
+    "correlated_analysis": (corelated_domain_together_prompt, corelated_domain_slim_prompt, corelated_domain_definitions),
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN
+
+
+def slimming_report(names: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Estimate the prompt tokens saved per stage for one candidate's subdomains.
+
+    Only the static template text is compared; the per-call inputs are the
+    same with or without slimming.
+
+    Args:
+        names: Subdomain names listed as strengths or development areas
+
+    Returns:
+        Mapping of stage name to full tokens, slim tokens and percentage saved
+    """
+    names = list(names)
+    report = {}
+    for stage, (full, slim, definitions) in SLIM_STAGES.items():
+        empty = {var: "" for var in full.input_variables}
+        full_tokens = estimate_tokens(full.format(**empty))
+        slim_tokens = estimate_tokens(slim.format(**empty, domain_definitions=definitions.render(names)))
+        report[stage] = {
+            "full_tokens": full_tokens,
+            "slim_tokens": slim_tokens,
+            "reduction": round(100 * (1 - slim_tokens / full_tokens), 1),
+        }
+    return report
@@ -0,0 +1,156 @@
+import time
+import asyncio
+import logging
+from collections import defaultdict, deque
+from typing import Dict, List, Any, Optional
+
+from langchain_core.runnables import ensure_config
+
+from llm_models import provider_slot, provider_name
+from metrics import record_queue_wait, record_llm_retry, llm_hedges, llm_failovers
+from config import (
+    HEDGE_ENABLED,
+    HEDGE_QUANTILE,
+    HEDGE_MIN_SAMPLES,
+    HEDGE_DEFAULT_DELAY_SECONDS,
+    HEDGE_MIN_DELAY_SECONDS,
+    LLM_MAX_RETRIES,
+    LLM_RETRY_BACKOFF_SECONDS
+)
+
+# Recent first-token latencies kept per model
+LATENCY_WINDOW = 200
+_first_token_latency: Dict[str, deque] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+
+
+def model_key(model) -> str:
+    return getattr(model, "model_name", None) or type(model).__name__
+
+
+def hedge_delay(model) -> float:
+    """Seconds to wait for a model's first token before hedging, from its recent latencies."""
+    samples = _first_token_latency[model_key(model)]
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY_SECONDS
+    ordered = sorted(samples)
+    quantile = ordered[min(len(ordered) - 1, int(HEDGE_QUANTILE * len(ordered)))]
+    return max(HEDGE_MIN_DELAY_SECONDS, quantile)
+
+
+class Race:
+    """Attempts in flight for one routed call; the first to emit a token leads."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.leader: Optional[asyncio.Task] = None
+        self.attempts: Dict[asyncio.Task, Any] = {}
+        self.started: Dict[asyncio.Task, float] = {}
+
+
+async def run_attempt(race: Race, model, prompt, inputs: Dict[str, Any], session_id: Optional[str]):
+    """
+    Stream one model's completion, taking the lead on its first token.
+
+    A call that fails before this attempt leads is retried up to
+    LLM_MAX_RETRIES times with exponential backoff; once its tokens have
+    been streamed an error goes straight to routed_invoke for failover.
+    """
+    me = asyncio.current_task()
+    for retry in range(LLM_MAX_RETRIES + 1):
+        try:
+            return await stream_attempt(race, me, model, prompt, inputs, session_id)
+        except Exception:
+            if race.leader is me or retry == LLM_MAX_RETRIES:
+                raise
+        record_llm_retry(model_key(model), session_id)
+        await asyncio.sleep(LLM_RETRY_BACKOFF_SECONDS * 2 ** retry)
+
+
+async def stream_attempt(race: Race, me: asyncio.Task, model, prompt, inputs: Dict[str, Any], session_id: Optional[str]):
+    """Make one streamed call for an attempt."""
+    waited = time.perf_counter()
+    async with provider_slot(model):
+        record_queue_wait(provider_name(model), time.perf_counter() - waited, session_id)
+        message = None
+        async for chunk in (prompt | model).astream(inputs):
+            if race.leader is None and chunk.content:
+                # First token wins the race: every other attempt is abandoned
+                race.leader = me
+                _first_token_latency[model_key(model)].append(time.perf_counter() - race.started[me])
+                for task in race.attempts:
+                    if task is not me:
+                        task.cancel()
+            message = chunk if message is None else message + chunk
+            if race.stream is not None and race.leader is me and chunk.content:
+                await race.stream.token(chunk.content)
+    return message
+
+
+async def routed_invoke(prompt, models: List[Any], inputs: Dict[str, Any], stream=None):
+    """
+    Run prompt | model over a stage's candidate models with hedging and failover.
+
+    The first model is called straight away. If it has not produced a token
+    within hedge_delay, the next model is called alongside it, and whichever
+    streams first wins while the other is cancelled. A model that still errors
+    after its retries (see run_attempt) is replaced by the next untried one.
+
+    Args:
+        prompt: Prompt template for the stage
+        models: Candidate chat models, in order of preference
+        inputs: Template variables
+        stream: Optional StageStream fed with the winning model's tokens
+
+    Returns:
+        Tuple of (the winning model's aggregated message, the winning model)
+    """
+    session_id = ensure_config().get("metadata", {}).get("session_id")
+    pending = list(models)
+    race = Race(stream)
+    last_error = None
+
+    def launch():
+        model = pending.pop(0)
+        task = asyncio.create_task(run_attempt(race, model, prompt, inputs, session_id))
+        race.attempts[task] = model
+        race.started[task] = time.perf_counter()
+        return task
+
+    latest = launch()
+    try:
+        while race.attempts:
+            timeout = None
+            if HEDGE_ENABLED and race.leader is None and pending:
+                deadline = race.started[latest] + hedge_delay(race.attempts[latest])
+                timeout = max(0.0, deadline - time.perf_counter())
+            done, _ = await asyncio.wait(race.attempts, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # The attempt may have taken the lead while we waited; then no hedge is needed
+                if race.leader is not None:
+                    continue
+                llm_hedges.inc(model_key(models[0]))
+                logging.info("Hedging %s with %s", model_key(race.attempts[latest]), model_key(pending[0]))
+                latest = launch()
+                continue
+            for task in done:
+                model = race.attempts.pop(task)
+                if task.cancelled():
+                    continue
+                if task.exception() is None:
+                    # Once an attempt leads, only its result matches what was streamed
+                    if race.leader is None or race.leader is task:
+                        return task.result(), model
+                    continue
+                last_error = task.exception()
+                logging.warning("LLM call to %s failed: %s", model_key(model), last_error)
+                if race.leader is task:
+                    race.leader = None
+                    if stream is not None:
+                        await stream.reset()
+            if not race.attempts and pending:
+                llm_failovers.inc(model_key(models[0]))
+                latest = launch()
+        raise last_error
+    finally:
+        for task in race.attempts:
+            task.cancel()
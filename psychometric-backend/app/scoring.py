@@ -0,0 +1,197 @@
+import numpy as np
+from typing import NamedTuple, List, Dict, Any, Tuple
+
+# Classification thresholds (see filter_subdomain / check_social_desireablitiy in utils)
+STRENGTH_THRESHOLD = 80
+DEVELOPMENT_THRESHOLD = 60
+FAIRNESS_DEVELOPMENT_THRESHOLD = 40
+HIGH_SCORE_THRESHOLD = 95
+
+# Neutral-answer thresholds, applied by response_bias_flags
+RESPONSE_BIAS_NEUTRALS = 15
+HIGH_RESPONSE_BIAS_NEUTRALS = 24
+
+# Canned analyses returned instead of an LLM analysis when bias is too high to interpret
+HIGH_RESPONSE_BIAS_ANALYSIS = (
+    "The individual seems to have taken the test carefully, possibly to conceal certain aspects of themselves. "
+    "The scores may not accurately reflect their traits and skills. Assessment during the interview is recommended."
+)
+HIGH_SOCIAL_DESIRABILITY_ANALYSIS = (
+    "According to the test scores, the candidate seems to have a tendency to appear in a desirable way. "
+    "Due to this factor of social desirability, her test scores may not be interpreted as accurate presentation of her skills."
+)
+CANNED_ANALYSES = (HIGH_RESPONSE_BIAS_ANALYSIS, HIGH_SOCIAL_DESIRABILITY_ANALYSIS)
+
+# Notes appended to an LLM analysis for moderate bias
+RESPONSE_BIAS_NOTE = "Note: response bias detected."
+SOCIAL_DESIRABILITY_NOTE = "Note: possible social desirability."
+
+
+class ScoreTable(NamedTuple):
+    """
+    Columnar scores of a cohort: one entry per (candidate, subdomain) row,
+    in sheet order, with subdomain names interned into `names`.
+    """
+    candidate: np.ndarray   # candidate index of each row
+    subdomain: np.ndarray   # index into `names` of each row
+    score: np.ndarray       # subdomain score (NaN when missing)
+    names: np.ndarray       # subdomain vocabulary
+    n_candidates: int
+
+
+class CohortClassification(NamedTuple):
+    """Vectorized classification of every row and candidate of a ScoreTable."""
+    strength: np.ndarray              # per row
+    development: np.ndarray           # per row
+    high_count: np.ndarray            # per candidate, subdomains scoring >= 95
+    low_count: np.ndarray             # per candidate, subdomains scoring <= 60
+    social_desirable: np.ndarray      # per candidate
+    high_social_desirable: np.ndarray # per candidate
+
+
+def build_score_table(cohort: List[List[Dict[str, Any]]]) -> ScoreTable:
+    """
+    Flatten the nested domain/subdomain records of many candidates into arrays.
+
+    Args:
+        cohort: One extract_score 'data' list per candidate
+
+    Returns:
+        ScoreTable holding every subdomain row of the cohort
+    """
+    vocabulary: Dict[str, int] = {}
+    candidate, subdomain, score = [], [], []
+    for index, data in enumerate(cohort):
+        for domain in data:
+            for sub in domain["subdomains"]:
+                candidate.append(index)
+                subdomain.append(vocabulary.setdefault(sub["name"], len(vocabulary)))
+                score.append(np.nan if sub["score"] is None else sub["score"])
+    names = np.empty(len(vocabulary), dtype=object)
+    names[:] = list(vocabulary)
+    return ScoreTable(
+        candidate=np.asarray(candidate, dtype=np.intp),
+        subdomain=np.asarray(subdomain, dtype=np.intp),
+        score=np.asarray(score, dtype=float),
+        names=names,
+        n_candidates=len(cohort),
+    )
+
+
+def classify_cohort(table: ScoreTable) -> CohortClassification:
+    """
+    Compute strengths, development areas and social desirability for a whole cohort.
+
+    Mirrors filter_subdomain and check_social_desireablitiy: FAIRNESS counts
+    as a development area only at 40 or below, and a candidate with more
+    than five very high scores and no low score is flagged as socially
+    desirable before the high-desirability rule (more than ten) applies.
+
+    Args:
+        table: Cohort scores from build_score_table
+
+    Returns:
+        CohortClassification with per-row and per-candidate arrays
+    """
+    score = table.score
+    fairness = table.names[table.subdomain] == "FAIRNESS"
+    strength = score >= STRENGTH_THRESHOLD
+    development = np.where(
+        fairness, score <= FAIRNESS_DEVELOPMENT_THRESHOLD, score <= DEVELOPMENT_THRESHOLD
+    )
+
+    high = score >= HIGH_SCORE_THRESHOLD
+    low = ~high & (score <= DEVELOPMENT_THRESHOLD)
+    high_count = np.bincount(table.candidate, weights=high, minlength=table.n_candidates).astype(int)
+    low_count = np.bincount(table.candidate, weights=low, minlength=table.n_candidates).astype(int)
+    social_desirable = (high_count > 5) & (low_count == 0)
+    high_social_desirable = ~social_desirable & (high_count > 10)
+
+    return CohortClassification(
+        strength=strength,
+        development=development,
+        high_count=high_count,
+        low_count=low_count,
+        social_desirable=social_desirable,
+        high_social_desirable=high_social_desirable,
+    )
+
+
+def rows_by_candidate(table: ScoreTable, mask: np.ndarray, descending: bool) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Order the masked rows by candidate, then by score (ties keep sheet order).
+
+    Returns:
+        (rows, bounds): row indices, and offsets such that candidate c owns
+        rows[bounds[c]:bounds[c + 1]]
+    """
+    rows = np.flatnonzero(mask)
+    scores = table.score[rows]
+    rows = rows[np.lexsort((rows, -scores if descending else scores, table.candidate[rows]))]
+    bounds = np.searchsorted(table.candidate[rows], np.arange(table.n_candidates + 1))
+    return rows, bounds
+
+
+def _grouped_records(table: ScoreTable, mask: np.ndarray, descending: bool) -> List[List[Dict[str, Any]]]:
+    """Per-candidate {'name', 'score'} lists of the masked rows, sorted by score."""
+    rows, bounds = rows_by_candidate(table, mask, descending)
+    names = table.names[table.subdomain[rows]].tolist()
+    scores = table.score[rows].tolist()
+    return [
+        [{"name": names[i], "score": scores[i]} for i in range(bounds[c], bounds[c + 1])]
+        for c in range(table.n_candidates)
+    ]
+
+
+def filter_cohort(cohort: List[List[Dict[str, Any]]]) -> List[Tuple[Dict[str, List[Dict[str, Any]]], bool, bool]]:
+    """
+    Batch equivalent of calling utils.filter_subdomain on every candidate.
+
+    Args:
+        cohort: One extract_score 'data' list per candidate
+
+    Returns:
+        One (filtered, social_desirable, high_social_desirable) tuple per candidate
+    """
+    table = build_score_table(cohort)
+    classified = classify_cohort(table)
+    strengths = _grouped_records(table, classified.strength, descending=True)
+    development = _grouped_records(table, classified.development, descending=False)
+    return [
+        (
+            {"Development areas": development[c], "Strengths": strengths[c]},
+            bool(classified.social_desirable[c]),
+            bool(classified.high_social_desirable[c]),
+        )
+        for c in range(table.n_candidates)
+    ]
+
+
+def count_neutral_responses(answer_columns: List[List[Any]]) -> np.ndarray:
+    """
+    Count "Neutral" answers of many sheets in one vectorized pass.
+
+    Args:
+        answer_columns: One "Question Value Name" column (list of answers) per sheet
+
+    Returns:
+        Array with the number of neutral answers of each sheet
+    """
+    lengths = np.fromiter((len(column) for column in answer_columns), dtype=np.intp, count=len(answer_columns))
+    answers = np.empty(int(lengths.sum()), dtype=object)
+    answers[:] = [answer for column in answer_columns for answer in column]
+    sheet = np.repeat(np.arange(len(answer_columns)), lengths)
+    return np.bincount(sheet, weights=answers == "Neutral", minlength=len(answer_columns)).astype(int)
+
+
+def response_bias_flags(neutral_counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Flag response bias over per-sheet neutral counts: moderate from
+    RESPONSE_BIAS_NEUTRALS, high from HIGH_RESPONSE_BIAS_NEUTRALS.
+
+    Returns:
+        (response_bias, high_response_bias) boolean arrays
+    """
+    response_bias = (neutral_counts >= RESPONSE_BIAS_NEUTRALS) & (neutral_counts < HIGH_RESPONSE_BIAS_NEUTRALS)
+    high_response_bias = neutral_counts >= HIGH_RESPONSE_BIAS_NEUTRALS
+    return response_bias, high_response_bias
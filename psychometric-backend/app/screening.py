@@ -0,0 +1,106 @@
+# screening.py
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils import extract_score, extract_items, normalize_sheet_name, duplicate_sheets
+from scoring import build_score_table, classify_cohort, rows_by_candidate
+
+# Screening parses whole cohorts, so it always streams .xlsx workbooks with
+# openpyxl whatever WORKBOOK_PARSER says; .xls uploads still go through pandas
+SCREEN_PARSER = "openpyxl"
+
+# Columns of the screening table, in order
+SCREEN_COLUMNS = [
+    "workbook",
+    "sheet_name",
+    "neutral_count",
+    "response_bias",
+    "high_response_bias",
+    "social_desirable",
+    "high_social_desirable",
+    "strengths",
+    "development_areas",
+    "outcome",
+]
+
+
+def screen_workbooks(workbooks: List[Tuple[str, Any, Optional[Any]]]) -> Dict[str, Any]:
+    """
+    Triage every candidate of one or more workbooks without calling an LLM.
+
+    Runs only the deterministic steps of /analyze/: parsing, response bias,
+    social desirability and strength/development classification. The whole
+    cohort is classified in one vectorized pass.
+
+    Args:
+        workbooks: (label, scores file, items file or None) tuples; files may be
+            paths or file-like objects
+
+    Returns:
+        Compact table with 'columns' and one row per score sheet. 'outcome' is
+        the path /analyze/ would take for the sheet: "high_response_bias" or
+        "high_social_desirability" (canned text) or "llm_analysis".
+    """
+    labels, sheet_names, cohort, item_records = [], [], [], []
+    for label, scores_file, items_file in workbooks:
+        sheets = extract_score(scores_file, SCREEN_PARSER)
+        # Bias flags are computed for all sheets of the workbook at once
+        items = extract_items(items_file, SCREEN_PARSER) if items_file is not None else {}
+        duplicates = duplicate_sheets(items)
+        if duplicates:
+            raise ValueError(f"{label}: items sheet names collide: " + "; ".join(
+                " vs ".join(repr(name) for name in group) for group in duplicates
+            ))
+        if items:
+            # Score sheets differing only in case or spacing would share one items sheet
+            score_names = defaultdict(list)
+            for sheet in sheets:
+                score_names[normalize_sheet_name(sheet["sheet_name"])].append(sheet["sheet_name"])
+            duplicates = [names for names in score_names.values() if len(names) > 1]
+            if duplicates:
+                raise ValueError(f"{label}: score sheet names collide: " + "; ".join(
+                    " vs ".join(repr(name) for name in group) for group in duplicates
+                ))
+        for sheet in sheets:
+            labels.append(label)
+            sheet_names.append(sheet["sheet_name"])
+            cohort.append(sheet["data"])
+            # Bias is unknown for sheets without an items sheet
+            item_records.append(items.get(normalize_sheet_name(sheet["sheet_name"]), {}))
+
+    table = build_score_table(cohort)
+    classified = classify_cohort(table)
+
+    # Subdomain names per candidate, strongest / weakest first
+    strengths = _names_by_candidate(table, classified.strength, descending=True)
+    development = _names_by_candidate(table, classified.development, descending=False)
+
+    rows = []
+    for c in range(table.n_candidates):
+        items = item_records[c]
+        if items.get("high_response_bias"):
+            outcome = "high_response_bias"
+        elif classified.high_social_desirable[c]:
+            outcome = "high_social_desirability"
+        else:
+            outcome = "llm_analysis"
+        rows.append([
+            labels[c],
+            sheet_names[c],
+            items.get("neutral_count"),
+            items.get("response_bias"),
+            items.get("high_response_bias"),
+            bool(classified.social_desirable[c]),
+            bool(classified.high_social_desirable[c]),
+            strengths[c],
+            development[c],
+            outcome,
+        ])
+    return {"columns": SCREEN_COLUMNS, "rows": rows}
+
+
+def _names_by_candidate(table, mask, descending: bool) -> List[List[str]]:
+    """Subdomain names of the masked rows for each candidate, sorted by score."""
+    rows, bounds = rows_by_candidate(table, mask, descending)
+    names = table.names[table.subdomain[rows]].tolist()
+    return [names[bounds[c]:bounds[c + 1]] for c in range(table.n_candidates)]
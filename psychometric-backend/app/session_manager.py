@@ -1,8 +1,245 @@
+import json
 import time
-from typing import Dict, Any
+import asyncio
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Dict, Any, Set, List, Callable, Awaitable
 
-# In-memory store for session statuses
-session_status: Dict[str, Dict[str, Any]] = {}
+from config import SESSION_STORE, SESSION_DB_PATH, SESSION_TTL_SECONDS, SESSION_MAX_ENTRIES
+
+
+class SessionStore(ABC):
+    """
+    Interface for session status backends.
+
+    Records are plain dictionaries keyed by session id. Entries expire
+    `ttl` seconds after their last update and the oldest entries are
+    evicted once the store holds more than `max_entries`.
+
+    Async code should use aget/aupdate/astats, which move the calls of a
+    `blocking` backend (one doing disk I/O) to a worker thread.
+    """
+
+    # Whether get/update/stats do blocking I/O
+    blocking = False
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.metrics = {"hits": 0, "misses": 0, "expirations": 0, "evictions": 0}
+
+    @abstractmethod
+    def get(self, session_id: str, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def update(self, session_id: str, fields: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss and eviction counters along with the current size."""
+        return {"backend": type(self).__name__, "size": len(self), **self.metrics}
+
+    async def aget(self, session_id: str, default: Any = None) -> Any:
+        """get() without blocking the event loop."""
+        if self.blocking:
+            return await asyncio.to_thread(self.get, session_id, default)
+        return self.get(session_id, default)
+
+    async def aupdate(self, session_id: str, fields: Dict[str, Any]) -> None:
+        """update() without blocking the event loop."""
+        if self.blocking:
+            return await asyncio.to_thread(self.update, session_id, fields)
+        return self.update(session_id, fields)
+
+    async def astats(self) -> Dict[str, Any]:
+        """stats() without blocking the event loop."""
+        if self.blocking:
+            return await asyncio.to_thread(self.stats)
+        return self.stats()
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU store with TTL expiry."""
+
+    def __init__(self, ttl: float, max_entries: int):
+        super().__init__(ttl, max_entries)
+        self._data: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._updated: Dict[str, float] = {}
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        record = self._data.get(session_id)
+        if record is None:
+            self.metrics["misses"] += 1
+            return default
+        if time.time() - self._updated[session_id] > self.ttl:
+            self.delete(session_id)
+            self.metrics["expirations"] += 1
+            self.metrics["misses"] += 1
+            return default
+        self._data.move_to_end(session_id)
+        self.metrics["hits"] += 1
+        return record
+
+    def update(self, session_id: str, fields: Dict[str, Any]) -> None:
+        self._data.setdefault(session_id, {}).update(fields)
+        self._data.move_to_end(session_id)
+        self._updated[session_id] = time.time()
+        while len(self._data) > self.max_entries:
+            oldest, _ = self._data.popitem(last=False)
+            del self._updated[oldest]
+            self.metrics["evictions"] += 1
+
+    def delete(self, session_id: str) -> None:
+        self._data.pop(session_id, None)
+        self._updated.pop(session_id, None)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    SQLite-backed store shared by every worker process pointing at the same file.
+
+    Calls wait up to `timeout` seconds for another writer's lock, so async
+    code must go through aget/aupdate/astats.
+    """
+
+    blocking = True
+
+    # Expired and excess rows are purged once every this many writes
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        super().__init__(ttl, max_entries)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated)")
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, updated FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            self.metrics["misses"] += 1
+            return default
+        if time.time() - row[1] > self.ttl:
+            self.delete(session_id)
+            self.metrics["expirations"] += 1
+            self.metrics["misses"] += 1
+            return default
+        self.metrics["hits"] += 1
+        return json.loads(row[0])
+
+    def update(self, session_id: str, fields: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            # Read-modify-write under an immediate lock so other workers cannot interleave
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT data FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                record = json.loads(row[0]) if row else {}
+                record.update(fields)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO sessions (session_id, data, updated) VALUES (?, ?, ?)",
+                    (session_id, json.dumps(record), now)
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._purge(now)
+
+    def _purge(self, now: float) -> None:
+        """Drop expired rows, then the oldest rows beyond max_entries. Caller holds the lock."""
+        expired = self._conn.execute(
+            "DELETE FROM sessions WHERE updated < ?", (now - self.ttl,)
+        ).rowcount
+        evicted = self._conn.execute(
+            "DELETE FROM sessions WHERE session_id IN ("
+            "SELECT session_id FROM sessions ORDER BY updated DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        self.metrics["expirations"] += expired
+        self.metrics["evictions"] += evicted
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store() -> SessionStore:
+    """Build the session store selected by the SESSION_STORE setting."""
+    if SESSION_STORE == "sqlite":
+        return SQLiteSessionStore(SESSION_DB_PATH, SESSION_TTL_SECONDS, SESSION_MAX_ENTRIES)
+    if SESSION_STORE == "memory":
+        return MemorySessionStore(SESSION_TTL_SECONDS, SESSION_MAX_ENTRIES)
+    raise ValueError(f"Unknown SESSION_STORE backend: {SESSION_STORE}")
+
+
+# Store for session statuses
+session_status: SessionStore = create_session_store()
+
+# Per-session subscriber queues that receive every status update as it happens
+_subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+
+# Pending events kept per subscriber; a slow client drops the oldest first
+SUBSCRIBER_QUEUE_SIZE = 100
+
+def subscribe(session_id: str) -> asyncio.Queue:
+    """Register a queue that receives every status update published for the session."""
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    _subscribers[session_id].add(queue)
+    return queue
+
+def unsubscribe(session_id: str, queue: asyncio.Queue) -> None:
+    """Remove a subscriber queue, dropping the session's entry once nobody listens."""
+    queues = _subscribers.get(session_id)
+    if queues is None:
+        return
+    queues.discard(queue)
+    if not queues:
+        del _subscribers[session_id]
+
+# Async callbacks run for every status update (e.g. Socket.IO room emits)
+_listeners: List[Callable[[Dict[str, Any]], Awaitable[None]]] = []
+
+def add_listener(listener: Callable[[Dict[str, Any]], Awaitable[None]]) -> None:
+    """Register an async callback that receives every published status event."""
+    _listeners.append(listener)
+
+def publish(session_id: str, event: Dict[str, Any]) -> None:
+    """Push an event to every subscriber of the session without waiting on any of them."""
+    for queue in _subscribers.get(session_id, ()):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
 
 async def update_session_status(
     session_id: str,
@@ -22,14 +259,68 @@ async def update_session_status(
         name: Name of the analysis (e.g., sheet name)
     """
     # Create or update the session status record
-    session_status.setdefault(session_id, {})
-    session_status[session_id].update({
+    record = {
         "agent": agent,
         "status": status,
         "progress": progress,
         "timestamp": time.time(),
         "name": name
-    })
-    # Optionally, emit via Socket.IO or SSE here
+    }
+    await session_status.aupdate(session_id, record)
+    # Push the update to everyone listening on this session
+    await broadcast({"session_id": session_id, **record})
+
+# Agent of the update sent once every sheet of a session is analyzed. Each sheet
+# reports its own progress up to 100, so only this (or a session-level error)
+# ends the session's event streams.
+SESSION_COMPLETE = "session_complete"
+SESSION_FINAL_AGENTS = (SESSION_COMPLETE, "error")
+
+def is_session_final(record: Dict[str, Any]) -> bool:
+    """Whether a status record is the last one a session will publish."""
+    return record.get("agent") in SESSION_FINAL_AGENTS and "kind" not in record
+
+async def complete_session(session_id: str, status: str = "All sheets analyzed") -> None:
+    """Publish the session-level completion after every sheet has finished."""
+    await update_session_status(session_id, agent=SESSION_COMPLETE, status=status, progress=100, name="")
 
+async def broadcast(event: Dict[str, Any]) -> None:
+    """Deliver an event to the session's subscribers and every registered listener."""
+    publish(event["session_id"], event)
+    for listener in _listeners:
+        await listener(event)
+
+# Status text of each kind of streamed event
+STREAM_STATUS = {"token": "streaming", "result": "stage complete", "reset": "restarting on another model"}
+
+async def publish_stream(
+    session_id: str,
+    agent: str,
+    kind: str,
+    text: str,
+    progress: int,
+    name: str = ""
+) -> None:
+    """
+    Push streamed LLM output for a session without touching the status store.
+
+    Args:
+        session_id: Unique identifier for the session
+        agent: Analysis step producing the text
+        kind: "token" for an incremental delta, "result" for the assembled output,
+            "reset" when earlier deltas should be discarded
+        text: The delta or the full result, depending on kind
+        progress: Progress percentage of the producing step
+        name: Name of the analysis (e.g., sheet name)
+    """
+    await broadcast({
+        "session_id": session_id,
+        "agent": agent,
+        "status": STREAM_STATUS[kind],
+        "progress": progress,
+        "timestamp": time.time(),
+        "name": name,
+        "kind": kind,
+        "text": text,
+    })
 
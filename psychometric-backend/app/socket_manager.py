@@ -1,5 +1,8 @@
 import socketio
 import logging
+from urllib.parse import parse_qs
+
+from session_manager import add_listener
 
 # Set up logging
 logging.basicConfig(level=logging.DEBUG)
@@ -20,28 +23,65 @@ socket_app = socketio.ASGIApp(sio)
 
 # Add a connection event handler
 @sio.event
-async def connect(sid, environ):
+async def connect(sid, environ, auth=None):
     print(f"Client connected: {sid}")
     print(f"Connection details: {environ.get('HTTP_USER_AGENT', 'Unknown')}")
-    
+
+    # Join the session room straight away if the client names one on connect,
+    # either in the auth payload or as a ?session_id= query parameter
+    session_id = auth.get('session_id') if isinstance(auth, dict) else None
+    if not session_id:
+        session_id = parse_qs(environ.get('QUERY_STRING', '')).get('session_id', [None])[0]
+    if session_id:
+        await sio.enter_room(sid, session_id)
+
     # Send a welcome message to confirm connection
     await sio.emit('welcome', {'message': 'Connected to server'}, room=sid)
 
+@sio.event
+async def subscribe(sid, data):
+    """Join the room of a session to receive its progress updates."""
+    session_id = (data or {}).get('session_id')
+    if not session_id:
+        return {'error': 'session_id is required'}
+    await sio.enter_room(sid, session_id)
+    return {'subscribed': session_id}
+
+@sio.event
+async def unsubscribe(sid, data):
+    """Leave the room of a session."""
+    session_id = (data or {}).get('session_id')
+    if session_id:
+        await sio.leave_room(sid, session_id)
+    return {'unsubscribed': session_id}
+
 @sio.event
 async def disconnect(sid):
     print(f"Client disconnected: {sid}")
 
-# Helper function to emit agent updates
-async def emit_agent_update(session_id, agent, status, progress):
+# Helper function to emit agent updates to the session's room only
+async def emit_agent_update(session_id, agent, status, progress, name="", **extra):
     if session_id:
-        print(f"Emitting agent update: {agent} - {status} - {progress}% for session {session_id}")
+        logger.debug(f"Emitting agent update: {agent} - {status} - {progress}% for session {session_id}")
         try:
             await sio.emit('agent_update', {
                 'session_id': session_id,
                 'agent': agent,
                 'status': status,
-                'progress': progress
-            })
-            print(f"Emit completed for {agent}")
+                'progress': progress,
+                'name': name,
+                **extra
+            }, room=session_id)
         except Exception as e:
-            print(f"Error emitting agent update: {e}") 
\ No newline at end of file
+            logger.error(f"Error emitting agent update: {e}")
+
+async def forward_session_update(event):
+    """Relay a session status update to the Socket.IO room of that session."""
+    # Streamed LLM output also carries its kind ("token"/"result") and text
+    extra = {key: event[key] for key in ('kind', 'text') if key in event}
+    await emit_agent_update(
+        event['session_id'], event['agent'], event['status'], event['progress'], event.get('name', ''), **extra
+    )
+
+# Every update_session_status call is emitted into its session's room
+add_listener(forward_session_update)
@@ -1,12 +1,16 @@
 import pandas as pd                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                                            
 from collections import defaultdict
+from openpyxl import load_workbook
 import re
 import time
+import zipfile
+from config import WORKBOOK_PARSER
+from scoring import count_neutral_responses, response_bias_flags
 from session_manager import update_session_status, session_status
 
 async def update_progress(session_id: str, step: str, message: str, pct: int, name: str = ""):
     """Only send an update if pct changed or >2s since last send."""
-    info = session_status.get(session_id, {})
+    info = await session_status.aget(session_id, {})
     last_ts, last_pct = info.get("timestamp", 0), info.get("progress", 0)
     now = time.time()
     if pct != last_pct or (now - last_ts) > 2:
@@ -103,58 +107,205 @@ def extract_name_score(text):
 
 
 
-def extract_score(file_path):
+def load_sheets(file_path, column_count):
     """
-    Extract scores from Excel file with multiple sheets
-    
+    Load every sheet of a workbook in one pass and cut each down to its data table.
+
+    The table header is the first row with exactly `column_count` filled
+    cells; rows above it (titles, candidate details) are dropped.
+
     Args:
-        file_path: Path to Excel file
-        
-    Returns:
-        List of dictionaries containing domain and subdomain scores for each sheet
+        file_path: Path or file-like object of the Excel file
+        column_count: Number of columns in the table header
+
+    Yields:
+        (sheet_name, DataFrame) pairs with the rows below the header
     """
-    # Load all sheets from the Excel file
-    excel_file = pd.ExcelFile(file_path)
-    all_results = []
-    
-    # Process each sheet
-    for sheet_name in excel_file.sheet_names:
-        # Load the sheet (skip initial header rows to access actual data)
-        df_raw = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-        header_row = None
-
-        for i in range(len(df_raw)):
-            row = df_raw.iloc[i]
-            row_values = [str(val).lower() for val in row if pd.notna(val)]
-            if(len(row_values) == 6):
-                header_row = i
-                break
-            if header_row is None:
-                continue
+    sheets = pd.read_excel(file_path, sheet_name=None, header=None)
+    for sheet_name, df_raw in sheets.items():
+        filled = df_raw.notna().sum(axis=1).to_numpy()
+        header_rows = (filled == column_count).nonzero()[0]
+        header_row = header_rows[0] if len(header_rows) else 0
+        yield sheet_name, df_raw.iloc[header_row + 1:].reset_index(drop=True)
 
-        df = pd.read_excel(file_path, sheet_name=sheet_name, skiprows=header_row)
-        
-        # Skip if sheet is empty or doesn't have required columns
-        # if df.empty or not all(col in df.columns for col in ['Domain', 'Subdomain', 'Subdomain Total', 'Subdomain Obtained']):
-        #     continue
-            
+
+
+
+
+def read_score_rows_pandas(file_path):
+    """
+    Read (domain, subdomain) cells of every scores sheet through pandas.
+
+    Yields:
+        (sheet_name, rows) pairs; domains are filled downward and rows
+        without subdomain or score data are dropped
+    """
+    for sheet_name, df in load_sheets(file_path, 6):
         # Rename columns for easier access
         df.columns = ['Sr No', 'Domain', 'Subdomain', 'Items', 'Subdomain Total', 'Subdomain Obtained']
         
         # Fill missing domain values downward
         df['Domain'] = df['Domain'].ffill()
-
         
         # Drop rows with missing subdomain or score data
         df = df.dropna(subset=['Subdomain', 'Subdomain Total', 'Subdomain Obtained'])
+        yield sheet_name, zip(df['Domain'].tolist(), df['Subdomain'].tolist())
+
+
+
+
+
+def read_item_columns_pandas(file_path):
+    """
+    Read the sub-domain and selected-option columns of every items sheet through pandas.
+
+    Yields:
+        (sheet_name, sub_domains, selected_options) tuples
+    """
+    for sheet_name, df in load_sheets(file_path, 7):
+        df.columns = ["S No", "Item No", "Question", "Domain", "Sub-Domain", "Question Value Name", "Question Value"]
+        yield sheet_name, df["Sub-Domain"].tolist(), df["Question Value Name"].tolist()
+
+
+
+
+
+def stream_sheet_rows(file_path, column_count):
+    """
+    Stream the rows below the table header of every sheet with openpyxl.
+
+    The workbook is opened read-only so rows are parsed lazily and memory
+    stays constant regardless of sheet size. The header is the first row
+    with exactly `column_count` filled cells, as in load_sheets.
+
+    Args:
+        file_path: Path or file-like object of an .xlsx file
+        column_count: Number of columns in the table header
+
+    Yields:
+        (sheet_name, rows) pairs; each row is a tuple of `column_count` values
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            rows = (
+                (tuple(row) + (None,) * column_count)[:column_count]
+                for row in worksheet.iter_rows(values_only=True)
+            )
+            # Rows are buffered only until the header shows up
+            preamble = []
+            for row in rows:
+                if sum(value is not None for value in row) == column_count:
+                    break
+                preamble.append(row)
+            else:
+                # No header: treat the first row as the header, like the pandas path
+                rows = iter(preamble[1:])
+            yield worksheet.title, rows
+    finally:
+        workbook.close()
+
+
+
+
+
+def read_score_rows_streaming(file_path):
+    """Streaming counterpart of read_score_rows_pandas built on openpyxl."""
+    for sheet_name, rows in stream_sheet_rows(file_path, 6):
+        yield sheet_name, filter_score_rows(rows)
+
+
+def filter_score_rows(rows):
+    """Fill domains downward and keep (domain, subdomain) of rows that carry scores."""
+    domain = None
+    for _, domain_cell, subdomain, _, total, obtained in rows:
+        # Fill missing domain values downward
+        if domain_cell is not None:
+            domain = domain_cell
+        # Skip rows with missing subdomain or score data
+        if subdomain is None or total is None or obtained is None:
+            continue
+        yield domain, subdomain
+
+
+
+
+
+# Value pandas gives empty cells; the streaming parser uses it too so both backends agree
+MISSING_CELL = float("nan")
+
+
+def read_item_columns_streaming(file_path):
+    """Streaming counterpart of read_item_columns_pandas built on openpyxl."""
+    for sheet_name, rows in stream_sheet_rows(file_path, 7):
+        sub_domain_column, question_selected = [], []
+        blank_rows = 0
+        for row in rows:
+            # Trailing blank rows are dropped, as pandas does
+            if all(value is None for value in row):
+                blank_rows += 1
+                continue
+            sub_domain_column.extend([MISSING_CELL] * blank_rows)
+            question_selected.extend([MISSING_CELL] * blank_rows)
+            blank_rows = 0
+            sub_domain_column.append(MISSING_CELL if row[4] is None else row[4])
+            question_selected.append(MISSING_CELL if row[5] is None else row[5])
+        yield sheet_name, sub_domain_column, question_selected
+
+
+
+
+
+def use_streaming_parser(file_path, parser=None):
+    """Whether the streaming backend is selected and can read this workbook (.xlsx only)."""
+    if (parser or WORKBOOK_PARSER) != "openpyxl":
+        return False
+    if hasattr(file_path, "seek"):
+        is_xlsx = zipfile.is_zipfile(file_path)
+        file_path.seek(0)
+        return is_xlsx
+    return zipfile.is_zipfile(file_path)
+
+
+def read_score_rows(file_path, parser=None):
+    """Read score rows with the given backend, by default the one selected by WORKBOOK_PARSER."""
+    if use_streaming_parser(file_path, parser):
+        return read_score_rows_streaming(file_path)
+    return read_score_rows_pandas(file_path)
+
+
+def read_item_columns(file_path, parser=None):
+    """Read item columns with the given backend, by default the one selected by WORKBOOK_PARSER."""
+    if use_streaming_parser(file_path, parser):
+        return read_item_columns_streaming(file_path)
+    return read_item_columns_pandas(file_path)
+
+
+
+
+
+def extract_score(file_path, parser=None):
+    """
+    Extract scores from Excel file with multiple sheets
+    
+    Args:
+        file_path: Path to Excel file
+        parser: Workbook parser backend ("pandas" or "openpyxl"); defaults to WORKBOOK_PARSER
         
+    Returns:
+        List of dictionaries containing domain and subdomain scores for each sheet
+    """
+    all_results = []
+    
+    # Process each sheet with the configured parser backend
+    for sheet_name, rows in read_score_rows(file_path, parser):
         result = []
         current_domain = None
         
-        # Iterate over each row and build structured output
-        for _, row in df.iterrows():
-            domain_name, domain_score = extract_name_score(row['Domain'])
-            subdomain_name, subdomain_score = extract_name_score(row['Subdomain'])
+        # Iterate over each (domain, subdomain) row and build structured output
+        for domain_cell, subdomain_cell in rows:
+            domain_name, domain_score = extract_name_score(domain_cell)
+            subdomain_name, subdomain_score = extract_name_score(subdomain_cell)
             
             # If we encounter a new domain, push the previous and start a new one
             if current_domain is None or current_domain['name'] != domain_name:
@@ -198,44 +349,44 @@ def extract_score(file_path):
 
 
 
-def extract_items(file_path):
-    # Load all sheets from the Excel file
-    excel_file = pd.ExcelFile(file_path)
-    all_results = []
-    
-    # Process each sheet
-    for sheet_name in excel_file.sheet_names:
-        # Load the sheet (skip initial header rows to access actual data)
-        df_raw = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-        header_row = None
+def normalize_sheet_name(sheet_name):
+    """Key used to match score and item sheets: case-insensitive, whitespace collapsed."""
+    return " ".join(str(sheet_name).split()).casefold()
 
-        for i in range(len(df_raw)):
 
-            row = df_raw.iloc[i]
-            row_values = [str(val).lower() for val in row if pd.notna(val)]
 
-            if(len(row_values) == 7):
-                header_row = i
-                break
-            if header_row is None:
-                continue
 
-        df = pd.read_excel(file_path, sheet_name=sheet_name, skiprows=header_row)
-        
-        # Skip if sheet is empty or doesn't have required columns
-        # if df.empty or not all(col in df.columns for col in ["Sub-Domain", "Question Value Name"]):
-        #     continue
-        df.columns = ["S No", "Item No", "Question", "Domain", "Sub-Domain", "Question Value Name", "Question Value"]
-            
-        sub_domain_column = df["Sub-Domain"].tolist()
-        question_selected = df["Question Value Name"].tolist()
-        
-        # Check Response Biasness present in the data
-        response_bias, high_response_bias = check_response_bias(question_selected)
+
+def extract_items(file_path, parser=None):
+    """
+    Extract item answers from Excel file with multiple sheets
+    
+    Args:
+        file_path: Path or file-like object of the Excel file
+        parser: Workbook parser backend ("pandas" or "openpyxl"); defaults to WORKBOOK_PARSER
         
-        # Update overall bias flags
-        # overall_response_bias = overall_response_bias or response_bias
-        # overall_high_response_bias = overall_high_response_bias or high_response_bias
+    Returns:
+        Dictionary keyed by normalize_sheet_name(sheet name), in sheet order,
+        of records with each sheet's items grouped by sub-domain and that
+        sheet's own response bias flags. Later sheets whose names normalize
+        to the same key are not parsed; their names are listed under the
+        first sheet's 'duplicates' (see duplicate_sheets)
+    """
+    all_results = {}
+    
+    # Process each sheet with the configured parser backend
+    sheets = list(read_item_columns(file_path, parser))
+    
+    # Check Response Biasness of every sheet at once
+    neutral_counts = count_neutral_responses([question_selected for _, _, question_selected in sheets])
+    response_bias, high_response_bias = response_bias_flags(neutral_counts)
+    
+    for index, (sheet_name, sub_domain_column, question_selected) in enumerate(sheets):
+        # Names differing only in case or spacing cannot be told apart when pairing
+        key = normalize_sheet_name(sheet_name)
+        if key in all_results:
+            all_results[key]['duplicates'].append(sheet_name)
+            continue
         
         # Dictionary to store multiple values per key
         grouped_values = defaultdict(list)
@@ -250,13 +401,34 @@ def extract_items(file_path):
         rename_map = {'SELF-CONTROL': 'EMOTIONAL COMPOSURE', 'SELF-REGULATION': 'EMOTIONAL MANAGEMENT'}
         grouped_values = {rename_map.get(k, k): v for k, v in grouped_values.items()}
         
-        # Add sheet results to all_results
-        all_results.append({
+        # Index sheet results by normalized sheet name
+        all_results[key] = {
             'sheet_name': sheet_name,
-            'data': grouped_values
-        })
+            'data': grouped_values,
+            'neutral_count': int(neutral_counts[index]),
+            'response_bias': bool(response_bias[index]),
+            'high_response_bias': bool(high_response_bias[index]),
+            'duplicates': []
+        }
     
-    return all_results, response_bias, high_response_bias
+    return all_results
+
+
+
+def duplicate_sheets(items_index):
+    """
+    Groups of items sheet names that collide after normalize_sheet_name.
+
+    Args:
+        items_index: Items records from extract_items
+
+    Returns:
+        List of [kept sheet name, *colliding sheet names], one per collision
+    """
+    return [
+        [record['sheet_name'], *record['duplicates']]
+        for record in items_index.values() if record['duplicates']
+    ]
 
 
 
@@ -289,9 +461,9 @@ def filter_subdomain(data):
           elif sub_score <= 60:
               results["Development areas"].append({"name": sub_name, "score": sub_score})
 
-      # Sort Values of Strength and Weakness       
-      results["Strengths"] = sorted(results["Strengths"], key = lambda x:x["score"], reverse = True)
-      results["Development areas"] = sorted(results["Development areas"], key = lambda x:x["score"])
+  # Sort Values of Strength and Weakness once all domains are collected
+  results["Strengths"] = sorted(results["Strengths"], key = lambda x:x["score"], reverse = True)
+  results["Development areas"] = sorted(results["Development areas"], key = lambda x:x["score"])
 
   return results, social_desireable, high_social_desireable
 
@@ -300,29 +472,16 @@ def filter_subdomain(data):
 
 
 def check_response_bias(response_data):
-    # Initialize the response bias flag
-    response_bias = False
-    high_response_bias = False
-
-    # Count how many times "Neutral" appears in the response list
-    neutral_count = response_data.count("Neutral")
+    """
+    Response bias flags of one sheet's "Question Value Name" answers.
 
-    # Check for potential response bias based on the number of neutral responses
-    if 15 <= neutral_count < 24:
-        # Moderate number of neutrals — may indicate some bias
-        response_bias = True
+    Thin wrapper over scoring.response_bias_flags, which holds the thresholds.
 
-    elif neutral_count >= 24:
-        # High number of neutrals — likely indicates strong response bias
-        analysis = (
-            "The individual seems to have taken the test carefully, "
-            "possibly to conceal certain aspects of themselves. "
-            "The scores may not accurately reflect their traits and skills. "
-            "Assessment during the interview is recommended."
-        )
-        high_response_bias = True
-    # Return the result indicating presence or absence of response bias
-    return response_bias, high_response_bias
+    Returns:
+        Tuple of (response_bias, high_response_bias)
+    """
+    response_bias, high_response_bias = response_bias_flags(count_neutral_responses([list(response_data)]))
+    return bool(response_bias[0]), bool(high_response_bias[0])
 
 
 
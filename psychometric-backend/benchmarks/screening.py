@@ -0,0 +1,64 @@
+"""
+Screening benchmark: screen_workbooks at cohort scale.
+
+A cohort is uploaded as several 100-sheet scores / items workbook pairs, as
+/screen receives them. Each cohort size is screened with the streaming
+parser /screen uses (SCREEN_PARSER) and, for comparison, with pandas.
+
+Usage (from psychometric-backend/):
+    python benchmarks/screening.py [--cohorts 100 1000 3000] [--sheets-per-workbook 100] [--runs 1]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+os.environ.setdefault("GROQ_API_KEY", "x")
+os.environ.setdefault("TOGETHER_API_KEY", "x")
+
+import screening  # noqa: E402
+from workbooks import make_workbooks  # noqa: E402
+
+BACKENDS = (screening.SCREEN_PARSER, "pandas")
+
+
+def screen(backend, workbooks, runs):
+    """Best wall time of screening the workbooks with `backend`, and the row count."""
+    screening.SCREEN_PARSER = backend
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        table = screening.screen_workbooks(workbooks)
+        times.append(time.perf_counter() - started)
+    return min(times), len(table["rows"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cohorts", type=int, nargs="+", default=[100, 1000, 3000])
+    parser.add_argument("--sheets-per-workbook", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'candidates':>10}{'workbooks':>11}" + "".join(f"{backend:>12}{'ms/cand':>9}" for backend in BACKENDS))
+    with tempfile.TemporaryDirectory() as scratch:
+        scores_path = os.path.join(scratch, "scores.xlsx")
+        items_path = os.path.join(scratch, "items.xlsx")
+        make_workbooks(args.sheets_per_workbook, scores_path, items_path)
+        for candidates in args.cohorts:
+            count = max(1, candidates // args.sheets_per_workbook)
+            # Screening parses each upload separately, so one pair repeated stands in for a cohort
+            workbooks = [(f"workbook-{n}.xlsx", scores_path, items_path) for n in range(count)]
+            line = f"{count * args.sheets_per_workbook:>10}{count:>11}"
+            for backend in BACKENDS:
+                seconds, rows = screen(backend, workbooks, args.runs)
+                line += f"{seconds:>11.2f}s{1000 * seconds / rows:>9.2f}"
+            print(line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
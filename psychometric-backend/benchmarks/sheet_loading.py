@@ -0,0 +1,87 @@
+"""
+Sheet loading benchmark: load_sheets vs the per-sheet loading it replaced.
+
+The old extract_score / extract_items opened the workbook with pd.ExcelFile
+and then called pd.read_excel twice per sheet (once headerless to find the
+header row, once again with skiprows). load_sheets reads every sheet once
+with sheet_name=None. Both are timed on 100-sheet scores and items
+workbooks; fails (exit code 1) when the speedup is below the target.
+
+Usage (from psychometric-backend/):
+    python benchmarks/sheet_loading.py [--sheets 100] [--runs 3] [--target 2.0]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+os.environ.setdefault("GROQ_API_KEY", "x")
+os.environ.setdefault("TOGETHER_API_KEY", "x")
+
+import pandas as pd  # noqa: E402
+
+from utils import load_sheets  # noqa: E402
+from workbooks import make_workbooks  # noqa: E402
+
+# Minimum speedup of load_sheets over per-sheet loading
+SPEEDUP_TARGET = 2.0
+
+
+def load_sheets_per_sheet(file_path, column_count):
+    """The previous loading: two read_excel calls per sheet."""
+    excel_file = pd.ExcelFile(file_path)
+    for sheet_name in excel_file.sheet_names:
+        df_raw = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
+        header_row = None
+        for i in range(len(df_raw)):
+            row_values = [val for val in df_raw.iloc[i] if pd.notna(val)]
+            if len(row_values) == column_count:
+                header_row = i
+                break
+        yield sheet_name, pd.read_excel(file_path, sheet_name=sheet_name, skiprows=header_row)
+
+
+def best_time(loader, workbooks, runs):
+    """Best wall time over `runs` of loading every sheet of every workbook."""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        for path, column_count in workbooks:
+            for _ in loader(path, column_count):
+                pass
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sheets", type=int, default=100)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--target", type=float, default=SPEEDUP_TARGET)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        scores_path = os.path.join(scratch, "scores.xlsx")
+        items_path = os.path.join(scratch, "items.xlsx")
+        make_workbooks(args.sheets, scores_path, items_path)
+        workbooks = [(scores_path, 6), (items_path, 7)]
+
+        per_sheet = best_time(load_sheets_per_sheet, workbooks, args.runs)
+        single_pass = best_time(load_sheets, workbooks, args.runs)
+
+    speedup = per_sheet / single_pass
+    print(f"{args.sheets} sheets x 2 workbooks, best of {args.runs} runs")
+    print(f"  per-sheet read_excel: {per_sheet:7.3f}s")
+    print(f"  load_sheets:          {single_pass:7.3f}s")
+    print(f"  speedup:              {speedup:7.1f}x (target {args.target:.1f}x)")
+    if speedup < args.target:
+        print(f"FAIL: speedup {speedup:.1f}x is below the {args.target:.1f}x target")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
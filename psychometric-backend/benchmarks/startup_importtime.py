@@ -0,0 +1,79 @@
+"""
+Startup benchmark: measures `import main` with `python -X importtime`.
+
+Fails (exit code 1) when the best of several runs exceeds the budget, or when
+a module that should load lazily shows up on main's import path.
+
+Usage (from psychometric-backend/):
+    python benchmarks/startup_importtime.py [--runs 5] [--budget 0.6]
+"""
+import os
+import re
+import sys
+import argparse
+import tempfile
+import subprocess
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+
+# Cumulative import time allowed for `import main`, in seconds
+STARTUP_BUDGET_SECONDS = 0.6
+
+# Heavy modules that must stay off main's import path (loaded on first use)
+DEFERRED_MODULES = ("langgraph", "langchain_groq", "langchain_together", "pandas", "agent", "pipeline")
+
+LINE_PATTERN = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def measure_once():
+    """
+    Import main in a fresh interpreter.
+
+    Returns:
+        Tuple of (cumulative seconds for main, {module: cumulative seconds})
+    """
+    with tempfile.TemporaryDirectory() as scratch:
+        # Keep the LLM cache opened at import out of the source tree
+        env = {**os.environ, "GROQ_API_KEY": os.environ.get("GROQ_API_KEY", "x"),
+               "TOGETHER_API_KEY": os.environ.get("TOGETHER_API_KEY", "x"),
+               "LLM_CACHE_DB_PATH": os.path.join(scratch, "llm_cache.db")}
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=APP_DIR, env=env, capture_output=True, text=True, check=True
+        )
+    modules = {}
+    for line in proc.stderr.splitlines():
+        match = LINE_PATTERN.match(line)
+        if match:
+            modules[match.group(4)] = int(match.group(2)) / 1e6
+    return modules["main"], modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_SECONDS)
+    parser.add_argument("--top", type=int, default=10, help="slowest top-level imports to list")
+    args = parser.parse_args()
+
+    runs = [measure_once() for _ in range(args.runs)]
+    best, modules = min(runs, key=lambda run: run[0])
+
+    print(f"import main: best {best:.3f}s over {args.runs} runs (budget {args.budget:.3f}s)")
+    print("slowest imports (cumulative):")
+    for name, seconds in sorted(modules.items(), key=lambda item: -item[1])[1:args.top + 1]:
+        print(f"  {seconds:7.3f}s  {name}")
+
+    failed = False
+    leaked = sorted(name for name in modules if name.split(".")[0] in DEFERRED_MODULES)
+    if leaked:
+        print(f"FAIL: deferred modules imported at startup: {', '.join(leaked)}")
+        failed = True
+    if best > args.budget:
+        print(f"FAIL: startup import time {best:.3f}s exceeds budget {args.budget:.3f}s")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
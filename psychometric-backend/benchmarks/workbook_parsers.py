@@ -0,0 +1,71 @@
+"""
+Workbook parser benchmark: pandas vs streaming openpyxl (WORKBOOK_PARSER).
+
+Times extract_score and extract_items with each backend on small, large
+(long sheets) and many-sheet workbooks, and checks that both backends give
+the same result. Fails (exit code 1) when the outputs differ.
+
+Usage (from psychometric-backend/):
+    python benchmarks/workbook_parsers.py [--runs 3]
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+os.environ.setdefault("GROQ_API_KEY", "x")
+os.environ.setdefault("TOGETHER_API_KEY", "x")
+
+import utils  # noqa: E402
+from workbooks import make_workbooks  # noqa: E402
+
+BACKENDS = ("pandas", "openpyxl")
+
+# name: (sheets, item rows per sheet, domain tables per scores sheet)
+WORKBOOKS = {
+    "small": (5, 48, 1),
+    "large": (5, 5000, 100),
+    "many-sheet": (500, 48, 1),
+}
+
+
+def parse(backend, scores_path, items_path):
+    """Run both extractors with `backend`; return (seconds, scores, items)."""
+    utils.WORKBOOK_PARSER = backend
+    started = time.perf_counter()
+    scores = utils.extract_score(scores_path)
+    items = utils.extract_items(items_path)
+    return time.perf_counter() - started, scores, items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'workbook':<12}{'sheets':>8}{'rows':>8}" + "".join(f"{backend:>12}" for backend in BACKENDS))
+    with tempfile.TemporaryDirectory() as scratch:
+        for name, (sheets, questions, blocks) in WORKBOOKS.items():
+            scores_path = os.path.join(scratch, f"{name}-scores.xlsx")
+            items_path = os.path.join(scratch, f"{name}-items.xlsx")
+            make_workbooks(sheets, scores_path, items_path, questions=questions, score_blocks=blocks)
+
+            best, outputs = {}, {}
+            for backend in BACKENDS:
+                runs = [parse(backend, scores_path, items_path) for _ in range(args.runs)]
+                best[backend] = min(run[0] for run in runs)
+                # repr compares the NaN cells of blank rows as equal
+                outputs[backend] = repr(runs[0][1:])
+            print(f"{name:<12}{sheets:>8}{questions:>8}" + "".join(f"{best[b]:>11.3f}s" for b in BACKENDS))
+            if len(set(outputs.values())) > 1:
+                print(f"FAIL: backends disagree on the {name} workbook")
+                failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Synthetic scores / items workbooks shaped like the real uploads, for benchmarks.
+
+Each candidate gets one sheet in both workbooks: a short preamble, the table
+header, then the data rows (scores: one row per subdomain; items: one row
+per question).
+"""
+import random
+
+from openpyxl import Workbook
+
+DOMAINS = {
+    "TEAMWORK": ["ABILITY TO WORK WITH OTHERS", "HELPING OTHERS"],
+    "EMOTIONAL STABILITY": ["SELF-CONTROL", "INSIGHTFULNESS", "SELF-REGULATION", "PASSIVE AGGRESSION",
+                            "PROBLEM SOLVING", "PATIENCE"],
+    "ORGANIZATIONAL VALUES": ["DUTIFULNESS", "MORAL OBLIGATION", "MORAL VALUES", "FAIRNESS"],
+    "OPENNESS": ["OPENNESS TO LIMITATIONS", "OPENNESS TO GROWTH", "OPENNESS TO INDIVIDUALITY",
+                 "OPENNESS TO NEW EXPERIENCES"],
+}
+SUBDOMAINS = [sub for subs in DOMAINS.values() for sub in subs]
+OPTIONS = ["Strongly Agree", "Agree", "Neutral", "Disagree", "Strongly Disagree"]
+
+
+def make_workbooks(n_sheets, scores_path, items_path, questions=48, score_blocks=1, seed=0):
+    """
+    Write a scores workbook and a matching items workbook.
+
+    Args:
+        n_sheets: Number of candidates (sheets per workbook)
+        scores_path: Where to save the scores workbook
+        items_path: Where to save the items workbook
+        questions: Item rows per items sheet
+        score_blocks: Times the domain table is repeated per scores sheet
+        seed: Seed for the random scores and answers
+    """
+    rnd = random.Random(seed)
+    scores, items = Workbook(), Workbook()
+    scores.remove(scores.active)
+    items.remove(items.active)
+    for k in range(n_sheets):
+        name = f"Candidate {k}"
+        sheet = scores.create_sheet(name)
+        sheet.append(["Psychometric report"])
+        sheet.append([])
+        sheet.append(["Name", name])
+        sheet.append(["Sr No", "Domain", "Subdomain", "Items", "Subdomain Total", "Subdomain Obtained"])
+        number = 1
+        for _ in range(score_blocks):
+            for domain, subdomains in DOMAINS.items():
+                for index, subdomain in enumerate(subdomains):
+                    score = rnd.choice([30, 40, 55, 65, 75, 85, 90, 96, 100])
+                    domain_cell = f"{domain} ({rnd.randint(40, 100)})" if index == 0 else None
+                    sheet.append([number, domain_cell, f"{subdomain} ({score})", 3, 15, score * 15 // 100])
+                    number += 1
+
+        sheet = items.create_sheet(name)
+        sheet.append(["Items report"])
+        sheet.append([])
+        sheet.append(["S No", "Item No", "Question", "Domain", "Sub-Domain", "Question Value Name", "Question Value"])
+        # Every fifth candidate answers mostly "Neutral" so bias flags vary
+        neutral = k % 5 == 0
+        for q in range(questions):
+            option = "Neutral" if neutral and q < questions * 26 // 48 else rnd.choice(OPTIONS)
+            sheet.append([q + 1, q + 1, f"Question {q + 1}", "D", SUBDOMAINS[q % len(SUBDOMAINS)], option, 3])
+    scores.save(scores_path)
+    items.save(items_path)
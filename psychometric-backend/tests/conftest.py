@@ -0,0 +1,11 @@
+import os
+import sys
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+# No provider is ever called and no cache is written during tests
+os.environ.setdefault("GROQ_API_KEY", "test")
+os.environ.setdefault("TOGETHER_API_KEY", "test")
+os.environ["LLM_CACHE_ENABLED"] = "false"
+os.environ["LLM_CACHE_DB_PATH"] = ""
@@ -0,0 +1,84 @@
+import time
+import asyncio
+import random
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+import agent
+import utils
+
+SESSIONS = 50
+# Longest the event loop may go without running a ready task while the sessions run
+MAX_LOOP_LAG_SECONDS = 0.25
+TICK_SECONDS = 0.01
+
+
+class FakeModel(FakeListChatModel):
+    """Streams a canned answer after a random delay, so sessions interleave."""
+    model_name: str = "fake"
+
+    async def _astream(self, *args, **kwargs):
+        await asyncio.sleep(random.uniform(0, 0.05))
+        async for chunk in super()._astream(*args, **kwargs):
+            yield chunk
+
+
+def sample_input(name: str) -> dict:
+    return {
+        "scores": {
+            "strength": [{"name": "Patience", "score": 85}],
+            "development_area": [{"name": "Dutifulness", "score": 40}],
+        },
+        "items": {"sheet_name": name, "data": {}},
+        "metadata": {"response_bias": False, "social_desirable": False},
+        "name": name,
+    }
+
+
+def test_concurrent_sessions_keep_their_own_events(monkeypatch):
+    random.seed(0)
+    model = FakeModel(responses=["Patience and Dutifulness. Overall, the candidate tends to be steady."])
+    monkeypatch.setattr(agent, "stage_models", lambda stage: [model])
+
+    events = []
+
+    async def record_status(session_id, agent_name, status, progress, name=""):
+        events.append((session_id, name, agent_name))
+        await asyncio.sleep(random.uniform(0, 0.01))
+
+    async def record_stream(session_id, agent_name, kind, text, progress, name=""):
+        events.append((session_id, name, agent_name))
+        await asyncio.sleep(0)
+
+    monkeypatch.setattr(utils, "update_session_status", record_status)
+    monkeypatch.setattr(agent, "publish_stream", record_stream)
+
+    lags = []
+
+    async def tick():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            lags.append(time.perf_counter() - started - TICK_SECONDS)
+
+    async def run_all():
+        ticker = asyncio.create_task(tick())
+        try:
+            return await asyncio.gather(*[
+                agent.analyze_psychometric_scores(sample_input(f"Sheet {i}"), f"session-{i}")
+                for i in range(SESSIONS)
+            ])
+        finally:
+            ticker.cancel()
+
+    results = asyncio.run(run_all())
+
+    assert len(results) == SESSIONS
+    # The loop stays responsive while every session is in flight
+    assert lags and max(lags) < MAX_LOOP_LAG_SECONDS, f"max loop lag {max(lags):.3f}s"
+    misattributed = [e for e in events if e[0].split("-")[1] != e[1].split(" ")[1]]
+    assert misattributed == []
+    # Every session reported its own start and completion
+    for i in range(SESSIONS):
+        agents = {a for session_id, _, a in events if session_id == f"session-{i}"}
+        assert {"start", "psychometric_analysis", "item_analysis", "complete"} <= agents
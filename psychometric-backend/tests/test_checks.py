@@ -0,0 +1,131 @@
+import re
+
+import pytest
+
+from checks import (
+    parse_judgment, find_missing_domains, is_mentioned, near_missing_threshold,
+    normalize_domain, rule_judge, MISSING_THRESHOLD,
+)
+from config import MISSING_CHECK_ESCALATE_AT
+from prompt_templates import psychometric_analysis_prompt
+from prompt_slimming import psychometric_definitions
+from schemas import MissingDomain
+
+
+def example_analyses():
+    """(scores, analysis) of every example in psychometric_analysis_prompt."""
+    template = psychometric_analysis_prompt.template
+    section = template.split("### Example Analyses")[1].split("Now analyze")[0]
+    examples = []
+    for block in re.split(r"\*\*Example \d:\*\*", section)[1:]:
+        scores, analysis = block.split("**Analysis** =")
+        development, strengths = scores.split("'Strengths':")
+        names = lambda text: [{"name": name} for name in re.findall(r"'name': '([^']+)'", text)]
+        examples.append(({"strength": names(strengths), "development_area": names(development)}, analysis.strip()))
+    return examples
+
+
+EXAMPLES = example_analyses()
+
+
+@pytest.mark.parametrize("reply", [
+    "Acceptable",
+    "acceptable.",
+    "**Acceptable**",
+    "\"Acceptable\"",
+    "The analysis is acceptable.",
+    "<think>Is it unacceptable? No.</think>\nAcceptable",
+])
+def test_parse_judgment_accepts(reply):
+    assert parse_judgment(reply) is True
+
+
+@pytest.mark.parametrize("reply", [
+    "Unacceptable",
+    "**Unacceptable** - the analysis ends with an overall summary.",
+    "The analysis is not acceptable.",
+    "Acceptable? No, it is unacceptable.",
+    "",
+    "I cannot decide.",
+])
+def test_parse_judgment_rejects(reply):
+    assert parse_judgment(reply) is False
+
+
+COMPOSURE_ANALYSIS = "The individual stays calm and shows composure under pressure. They listen to feedback."
+
+
+def test_rule_judge_accepts_composure_when_listed():
+    scores = {"strength": [{"name": "EMOTIONAL COMPOSURE"}], "development_area": []}
+    assert rule_judge(COMPOSURE_ANALYSIS, scores) is True
+
+
+def test_rule_judge_rejects_composure_when_not_listed():
+    scores = {"strength": [{"name": "PATIENCE"}], "development_area": [{"name": "FAIRNESS"}]}
+    assert rule_judge(COMPOSURE_ANALYSIS, scores) is False
+
+
+@pytest.mark.parametrize("closing", [
+    "Overall, they are a dependable team member.",
+    "In summary, they balance patience with drive.",
+    "Taken together, they adapt well to change.",
+])
+def test_rule_judge_rejects_summary_closing(closing):
+    analysis = "The individual helps colleagues readily. " + closing
+    assert rule_judge(analysis, {"strength": [], "development_area": []}) is False
+
+
+@pytest.mark.parametrize("closing", [
+    "Their tendency is to seek feedback before acting.",
+    "They generally prefer familiar routines.",
+])
+def test_rule_judge_defers_tendency_closing(closing):
+    analysis = "The individual helps colleagues readily. " + closing
+    assert rule_judge(analysis, {"strength": [], "development_area": []}) is None
+
+
+def test_prompt_examples_are_parsed():
+    assert len(EXAMPLES) == 7
+
+
+@pytest.mark.parametrize("scores, analysis", EXAMPLES)
+def test_prompt_examples_are_not_retried_on_local_check_alone(scores, analysis):
+    missing, unknown = find_missing_domains(scores, analysis)
+    assert unknown == []
+    exceeds = max(len(missing.missing_strengths), len(missing.missing_weaknesses)) > MISSING_THRESHOLD
+    # A reference analysis only reaches the retry after the LLM check confirms it
+    assert not exceeds or near_missing_threshold(missing, MISSING_CHECK_ESCALATE_AT)
+
+
+def test_prompt_example_5_behaviours_count_as_mentioned():
+    scores, analysis = EXAMPLES[4]
+    missing, _ = find_missing_domains(scores, analysis)
+    for name in ("Teamwork", "INSIGHTFULNESS", "SELF-CONTROL", "MORAL VALUES",
+                 "OPENNESS TO INDIVIDUALITY", "OPENNESS TO NEW EXPERIENCES"):
+        assert name not in missing.missing_strengths
+
+
+DEFINITION_LINES = [
+    (name, line.strip())
+    for _, subdomains in psychometric_definitions.domains
+    for name, fragment in subdomains
+    for line in re.sub(r"- \*\*[^*]+\*\*:", "", fragment).splitlines()
+    if line.strip()
+]
+
+
+@pytest.mark.parametrize("name, line", DEFINITION_LINES)
+def test_definition_wording_counts_as_mentioned(name, line):
+    assert is_mentioned(name, normalize_domain(line))
+
+
+def test_unrelated_text_is_not_a_mention():
+    text = normalize_domain("The individual may prefer structured schedules.")
+    assert not any(is_mentioned(name, text) for name, _ in DEFINITION_LINES)
+
+
+def test_near_missing_threshold():
+    missing = MissingDomain(missing_strengths=["A", "B", "C"], missing_weaknesses=[])
+    assert near_missing_threshold(missing, 3)
+    assert not near_missing_threshold(missing, 4)
+    assert not near_missing_threshold(missing, 0)
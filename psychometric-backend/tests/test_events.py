@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+from fastapi import Response
+
+import main
+from session_manager import update_session_status, publish_stream, complete_session
+
+
+def test_sse_stream_outlives_per_sheet_completion():
+    session_id = "sse-session"
+
+    async def run():
+        response = await main.sse_events(session_id, Response())
+        events = []
+
+        async def consume():
+            async for event in response.body_iterator:
+                events.append((event["event"], json.loads(event["data"])))
+
+        consumer = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        # Two sheets run concurrently; the first finishes before the second streams
+        await update_session_status(session_id, "complete", "Analysis complete!", 100, "Sheet 1")
+        await publish_stream(session_id, "item_analysis", "token", "partial", 15, "Sheet 2")
+        await update_session_status(session_id, "complete", "Analysis complete!", 100, "Sheet 2")
+        await asyncio.sleep(0.05)
+        assert not consumer.done()
+        await complete_session(session_id)
+        await asyncio.wait_for(consumer, timeout=1)
+        return events
+
+    events = asyncio.run(run())
+    assert [(kind, data.get("name"), data["agent"]) for kind, data in events] == [
+        ("update", "Sheet 1", "complete"),
+        ("token", "Sheet 2", "item_analysis"),
+        ("update", "Sheet 2", "complete"),
+        ("update", "", "session_complete"),
+    ]
+
+
+def test_room_emit_reaches_only_that_rooms_clients(monkeypatch):
+    import socket_manager
+    sio = socket_manager.sio
+
+    async def run(unrelated):
+        sent = []
+
+        async def record(eio_sid, eio_pkt):
+            sent.append(eio_sid)
+
+        monkeypatch.setattr(sio, "_send_eio_packet", record)
+        members = []
+        for n in range(2):
+            sid = await sio.manager.connect(f"member-{unrelated}-{n}", "/")
+            await sio.enter_room(sid, "room-session")
+            members.append(f"member-{unrelated}-{n}")
+        # Clients of other sessions, and clients that never subscribed
+        others = []
+        for n in range(unrelated):
+            sid = await sio.manager.connect(f"other-{unrelated}-{n}", "/")
+            if n % 2:
+                await sio.enter_room(sid, f"other-session-{n}")
+            others.append(sid)
+
+        await socket_manager.emit_agent_update("room-session", "item_analysis", "running", 40, "Sheet 1")
+
+        for sid in others:
+            await sio.manager.disconnect(sid, "/")
+        for eio_sid in members:
+            await sio.manager.disconnect(sio.manager.sid_from_eio_sid(eio_sid, "/"), "/")
+        return sent
+
+    # Sends per emit depend on the room's size, not on how many clients are connected
+    for unrelated in (10, 1000):
+        assert sorted(asyncio.run(run(unrelated))) == [f"member-{unrelated}-0", f"member-{unrelated}-1"]
@@ -0,0 +1,52 @@
+import asyncio
+
+import jobs
+import pipeline
+import session_manager
+from session_manager import SQLiteSessionStore
+
+
+def test_job_is_visible_from_another_worker(monkeypatch, tmp_path):
+    path = str(tmp_path / "sessions.db")
+    # Two workers, each with its own connection to the shared store
+    owner = SQLiteSessionStore(path, ttl=60, max_entries=100)
+    other = SQLiteSessionStore(path, ttl=60, max_entries=100)
+    monkeypatch.setattr(session_manager, "session_status", owner)
+    first_done = asyncio.Event()
+    release = asyncio.Event()
+
+    async def fake_analyze_sheets(pairs, session_id, max_concurrency, on_result):
+        await on_result(0, {"sheet_name": "Sheet 1", "analysis": "done"})
+        first_done.set()
+        await release.wait()
+        await on_result(1, {"sheet_name": "Sheet 2", "analysis": "done"})
+
+    monkeypatch.setattr(pipeline, "analyze_sheets", fake_analyze_sheets)
+    pairs = [({"sheet_name": "Sheet 1"}, {}), ({"sheet_name": "Sheet 2"}, {})]
+
+    async def read_from_other_worker(job_id):
+        monkeypatch.setattr(jobs, "session_status", other)
+        try:
+            return await jobs.get_job(job_id), await jobs.get_job_results(job_id)
+        finally:
+            monkeypatch.setattr(jobs, "session_status", owner)
+
+    async def run():
+        monkeypatch.setattr(jobs, "session_status", owner)
+        job_id = await jobs.submit_job(pairs)
+        queued, _ = await read_from_other_worker(job_id)
+        await first_done.wait()
+        running, partial = await read_from_other_worker(job_id)
+        release.set()
+        await asyncio.gather(*jobs._job_tasks)
+        finished, results = await read_from_other_worker(job_id)
+        return queued, running, partial, finished, results, await read_from_other_worker("unknown")
+
+    queued, running, partial, finished, results, unknown = asyncio.run(run())
+    assert queued["status"] == "queued" and queued["total_sheets"] == 2
+    assert running["status"] == "running" and running["completed_sheets"] == 1
+    assert partial["pending"] == ["Sheet 2"]
+    assert finished["status"] == "completed" and finished["finished"] is not None
+    assert finished["progress"]["agent"] == session_manager.SESSION_COMPLETE
+    assert [analysis["sheet_name"] for analysis in results["analyses"]] == ["Sheet 1", "Sheet 2"]
+    assert unknown == (None, None)
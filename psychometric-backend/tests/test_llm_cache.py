@@ -0,0 +1,51 @@
+import asyncio
+import sqlite3
+
+from llm_cache import LLMCache
+
+
+def test_async_round_trip_promotes_disk_hits(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    writer = LLMCache(max_entries=10, ttl=60, db_path=path, max_db_entries=100)
+    reader = LLMCache(max_entries=10, ttl=60, db_path=path, max_db_entries=100)
+
+    async def run():
+        await writer.aset("key", {"analysis": "text"})
+        first = await reader.aget("key")
+        second = await reader.aget("key")
+        missing = await reader.aget("other")
+        return first, second, missing, await reader.astats()
+
+    first, second, missing, stats = asyncio.run(run())
+    assert first == second == {"analysis": "text"}
+    assert missing is None
+    assert (stats["disk_hits"], stats["memory_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["disk_size"] == 1
+
+
+def test_disk_write_does_not_block_event_loop(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    cache = LLMCache(max_entries=10, ttl=60, db_path=path, max_db_entries=100)
+    # Another worker holds the write lock for a while
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        write = asyncio.create_task(cache.aset("key", "value"))
+        await asyncio.sleep(0.3)
+        other.execute("COMMIT")
+        await write
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(run()) >= 10
+    assert LLMCache(max_entries=10, ttl=60, db_path=path).get("key") == "value"
@@ -0,0 +1,41 @@
+import pytest
+
+from prompt_slimming import SLIM_STAGES
+
+STAGES = sorted(SLIM_STAGES)
+
+
+def sample_inputs(prompt):
+    return {var: f"<{var}>" for var in prompt.input_variables}
+
+
+@pytest.mark.parametrize("stage", STAGES)
+def test_full_render_reproduces_original_prompt(stage):
+    full, slim, definitions = SLIM_STAGES[stage]
+    inputs = sample_inputs(full)
+    assert slim.format(**inputs, domain_definitions=definitions.render(None)) == full.format(**inputs)
+
+
+@pytest.mark.parametrize("stage", STAGES)
+def test_profile_render_keeps_exactly_its_fragments(stage):
+    full, slim, definitions = SLIM_STAGES[stage]
+    fragments = {name: fragment for _, subdomains in definitions.domains for name, fragment in subdomains}
+    profile = ["PATIENCE", "Emotional Composure", "MORAL VALUES", "OPENNESS TO GROWTH"]
+    rendered = definitions.render(profile)
+
+    kept = {"patience", "emotional composure", "moral values", "openness to growth"}
+    assert kept <= set(fragments)
+    for name, fragment in fragments.items():
+        assert (fragment in rendered) == (name in kept), name
+    # Only the headers of domains with a kept subdomain remain
+    for header, subdomains in definitions.domains:
+        assert (header in rendered) == any(name in kept for name, _ in subdomains)
+
+    prompt = slim.format(**sample_inputs(full), domain_definitions=rendered)
+    assert all(fragments[name] in prompt for name in kept)
+    assert len(prompt) < len(full.format(**sample_inputs(full)))
+
+
+def test_unknown_name_falls_back_to_full_definitions():
+    _, _, definitions = SLIM_STAGES["psychometric_analysis"]
+    assert definitions.render(["PATIENCE", "NOT A SUBDOMAIN"]) == definitions.render(None)
@@ -0,0 +1,67 @@
+import asyncio
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.prompts import PromptTemplate
+
+import routing
+from metrics import llm_retries, llm_failovers
+
+PROMPT = PromptTemplate.from_template("Say {word}")
+
+
+class FakeModel(FakeListChatModel):
+    model_name: str = "fake"
+    failures: int = 0
+
+    async def _astream(self, *args, **kwargs):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("provider unavailable")
+        async for chunk in super()._astream(*args, **kwargs):
+            yield chunk
+
+
+def test_failed_call_is_retried_and_counted(monkeypatch):
+    monkeypatch.setattr(routing, "LLM_RETRY_BACKOFF_SECONDS", 0)
+    model = FakeModel(responses=["hello"], model_name="flaky", failures=2)
+    before = llm_retries.values[("flaky",)]
+
+    message, winner = asyncio.run(routing.routed_invoke(PROMPT, [model], {"word": "hello"}))
+
+    assert message.content == "hello"
+    assert winner is model
+    assert llm_retries.values[("flaky",)] - before == 2
+
+
+def test_exhausted_retries_fail_over_to_next_model(monkeypatch):
+    monkeypatch.setattr(routing, "LLM_RETRY_BACKOFF_SECONDS", 0)
+    broken = FakeModel(responses=["never"], model_name="broken", failures=routing.LLM_MAX_RETRIES + 1)
+    backup = FakeModel(responses=["backup answer"], model_name="backup")
+    before = llm_failovers.values[("broken",)]
+
+    message, winner = asyncio.run(routing.routed_invoke(PROMPT, [broken, backup], {"word": "hi"}))
+
+    assert message.content == "backup answer"
+    assert winner is backup
+    assert llm_failovers.values[("broken",)] - before == 1
+
+
+def test_cached_output_is_keyed_by_winning_model(monkeypatch):
+    import agent
+    from langchain_core.output_parsers import StrOutputParser
+    from llm_cache import LLMCache
+
+    cache = LLMCache(max_entries=10, ttl=60)
+    monkeypatch.setattr(agent, "llm_cache", cache)
+    monkeypatch.setattr(routing, "LLM_RETRY_BACKOFF_SECONDS", 0)
+    primary = FakeModel(responses=["never"], model_name="primary", failures=routing.LLM_MAX_RETRIES + 1)
+    backup = FakeModel(responses=["backup answer"], model_name="backup")
+    inputs = {"word": "hi"}
+
+    output, tokens = asyncio.run(agent.invoke_chain(PROMPT, [primary, backup], StrOutputParser(), inputs, stage="test"))
+
+    assert output == "backup answer"
+    assert cache.get(cache.make_key("test", PROMPT, inputs, backup)) == "backup answer"
+    assert cache.get(cache.make_key("test", PROMPT, inputs, primary)) is None
+    # The backup's answer serves the next lookup of the same route
+    assert asyncio.run(agent.invoke_chain(PROMPT, [primary, backup], StrOutputParser(), inputs, stage="test")) == ("backup answer", 0)
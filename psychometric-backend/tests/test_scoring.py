@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from scoring import filter_cohort
+from utils import filter_subdomain, check_response_bias
+
+
+def random_candidate(rng: random.Random):
+    """extract_score 'data' for one candidate with random domain and subdomain scores."""
+    data = []
+    for d in range(rng.randint(1, 6)):
+        subdomains = [
+            {"name": rng.choice(["FAIRNESS", f"SUB {d}.{s}"]), "score": rng.choice([
+                rng.randint(0, 100), 40, 41, 60, 61, 79, 80, 94, 95, 100
+            ])}
+            for s in range(rng.randint(1, 6))
+        ]
+        data.append({"name": f"DOMAIN {d}", "score": rng.randint(0, 100), "subdomains": subdomains})
+    return data
+
+
+def desirable_candidate(high: int, low: int):
+    """Candidate with `high` subdomains at 95+ and `low` at 60 or below."""
+    subdomains = [{"name": f"HIGH {i}", "score": 96} for i in range(high)]
+    subdomains += [{"name": f"LOW {i}", "score": 50} for i in range(low)]
+    subdomains += [{"name": "MID", "score": 70}]
+    return [{"name": "DOMAIN", "score": 80, "subdomains": subdomains}]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_filter_cohort_matches_filter_subdomain(seed):
+    rng = random.Random(seed)
+    cohort = [random_candidate(rng) for _ in range(rng.randint(1, 40))]
+    assert filter_cohort(cohort) == [filter_subdomain(data) for data in cohort]
+
+
+def test_filter_cohort_matches_social_desirability_rules():
+    cohort = [desirable_candidate(high, low) for high in (0, 5, 6, 10, 11, 15) for low in (0, 1)]
+    expected = [filter_subdomain(data) for data in cohort]
+    assert filter_cohort(cohort) == expected
+    # Both flags are exercised by the cohort
+    assert any(social for _, social, _ in expected)
+    assert any(high_social for _, _, high_social in expected)
+
+
+def test_filter_cohort_empty():
+    assert filter_cohort([]) == []
+
+
+@pytest.mark.parametrize("neutrals, expected", [
+    (0, (False, False)),
+    (14, (False, False)),
+    (15, (True, False)),
+    (23, (True, False)),
+    (24, (False, True)),
+    (48, (False, True)),
+])
+def test_check_response_bias_thresholds(neutrals, expected):
+    answers = ["Neutral"] * neutrals + ["Agree"] * (48 - neutrals)
+    assert check_response_bias(answers) == expected
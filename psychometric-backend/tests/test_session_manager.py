@@ -0,0 +1,61 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from session_manager import SessionStore, MemorySessionStore, SQLiteSessionStore
+
+
+def test_session_store_is_abstract():
+    with pytest.raises(TypeError):
+        SessionStore(ttl=60, max_entries=10)
+
+
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+def test_async_round_trip(backend, tmp_path):
+    if backend == "sqlite":
+        store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=60, max_entries=10)
+    else:
+        store = MemorySessionStore(ttl=60, max_entries=10)
+
+    async def run():
+        await store.aupdate("s1", {"progress": 10})
+        await store.aupdate("s1", {"status": "running"})
+        return await store.aget("s1"), await store.aget("missing", {}), await store.astats()
+
+    record, missing, stats = asyncio.run(run())
+    assert record == {"progress": 10, "status": "running"}
+    assert missing == {}
+    assert stats["size"] == 1
+
+
+def test_sqlite_update_does_not_block_event_loop(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SQLiteSessionStore(path, ttl=60, max_entries=10)
+    # Another worker holds the write lock for a while
+    other = sqlite3.connect(path, isolation_level=None)
+    other.execute("BEGIN IMMEDIATE")
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        update = asyncio.create_task(store.aupdate("s1", {"progress": 50}))
+        await asyncio.sleep(0.3)
+        other.execute("COMMIT")
+        await update
+        ticker.cancel()
+        return ticks
+
+    started = time.perf_counter()
+    ticks = asyncio.run(run())
+    assert time.perf_counter() - started >= 0.3
+    assert ticks >= 10
+    assert store.get("s1") == {"progress": 50}
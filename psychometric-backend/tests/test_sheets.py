@@ -0,0 +1,153 @@
+from openpyxl import Workbook
+
+from utils import extract_items, duplicate_sheets
+from pipeline import pair_sheets, sheet_mismatch_error
+
+HEADER = ["S No", "Item No", "Question", "Domain", "Sub-Domain", "Question Value Name", "Question Value"]
+
+
+def items_workbook(path, sheet_names):
+    workbook = Workbook()
+    workbook.remove(workbook.active)
+    for name in sheet_names:
+        sheet = workbook.create_sheet(name)
+        sheet.append(["Items report"])
+        sheet.append([])
+        sheet.append(HEADER)
+        for q in range(6):
+            sheet.append([q + 1, q + 1, f"Q{q}", "D", "PATIENCE", "Agree", 4])
+    workbook.save(path)
+    return path
+
+
+def test_colliding_items_sheets_are_reported(tmp_path):
+    path = items_workbook(tmp_path / "items.xlsx", ["Cand 1", "cand  1", "Cand 2"])
+    items = extract_items(str(path))
+
+    assert list(items) == ["cand 1", "cand 2"]
+    assert items["cand 1"]["sheet_name"] == "Cand 1"
+    assert duplicate_sheets(items) == [["Cand 1", "cand  1"]]
+
+    scores = [{"sheet_name": "Cand 1", "data": []}, {"sheet_name": "Cand 2", "data": []}]
+    pairs, missing, extra, duplicate_scores, duplicate_items = pair_sheets(scores, items)
+    assert len(pairs) == 2 and missing == [] and extra == []
+    assert duplicate_scores == []
+    assert duplicate_items == [["Cand 1", "cand  1"]]
+
+    error = sheet_mismatch_error(missing, extra, duplicate_scores, duplicate_items)
+    assert error["duplicate_items"] == [["Cand 1", "cand  1"]]
+    assert "'Cand 1' vs 'cand  1'" in error["error"]
+
+
+def test_distinct_items_sheets_have_no_duplicates(tmp_path):
+    path = items_workbook(tmp_path / "items.xlsx", ["Cand 1", "Cand 2"])
+    items = extract_items(str(path))
+    assert duplicate_sheets(items) == []
+
+    pairs, missing, extra, duplicate_scores, duplicate_items = pair_sheets([{"sheet_name": "Cand 3", "data": []}], items)
+    error = sheet_mismatch_error(missing, extra, duplicate_scores, duplicate_items)
+    assert error["missing_items"] == ["Cand 3"]
+    assert error["unmatched_items"] == ["Cand 1", "Cand 2"]
+    assert error["duplicate_scores"] == error["duplicate_items"] == []
+
+
+def test_colliding_score_sheets_are_reported(tmp_path):
+    items = extract_items(str(items_workbook(tmp_path / "items.xlsx", ["Cand 1"])))
+    scores = [{"sheet_name": "Cand 1", "data": []}, {"sheet_name": "cand  1", "data": []}]
+
+    pairs, missing, extra, duplicate_scores, duplicate_items = pair_sheets(scores, items)
+    assert duplicate_scores == [["Cand 1", "cand  1"]]
+    assert duplicate_items == []
+
+    error = sheet_mismatch_error(missing, extra, duplicate_scores, duplicate_items)
+    assert error["duplicate_scores"] == [["Cand 1", "cand  1"]]
+    assert "Score sheet names collide: 'Cand 1' vs 'cand  1'" in error["error"]
+
+
+SCORE_HEADER = ["Sr No", "Domain", "Subdomain", "Items", "Subdomain Total", "Subdomain Obtained"]
+OPTIONS = ["Strongly Agree", "Agree", "Neutral", "Disagree", "Strongly Disagree"]
+SUBDOMAINS = [
+    ("TEAMWORK", ["ABILITY TO WORK WITH OTHERS", "HELPING OTHERS"]),
+    ("EMOTIONAL STABILITY", ["SELF-CONTROL", "INSIGHTFULNESS", "SELF-REGULATION", "PATIENCE"]),
+    ("OPENNESS", ["OPENNESS TO GROWTH", "OPENNESS TO NEW EXPERIENCES"]),
+]
+
+
+def parser_workbooks(tmp_path):
+    """
+    Scores and items workbooks with the layouts both parsers must agree on:
+    title and candidate preamble rows, blank rows inside and after the
+    table and rows without scores.
+    """
+    scores, items = Workbook(), Workbook()
+    scores.remove(scores.active)
+    items.remove(items.active)
+    for k in range(3):
+        name = f"Candidate {k}"
+        sheet = scores.create_sheet(name)
+        sheet.append(["Psychometric report"])
+        sheet.append([])
+        sheet.append(["Name", name])
+        sheet.append(SCORE_HEADER)
+        row = 1
+        for domain, subdomains in SUBDOMAINS:
+            for index, subdomain in enumerate(subdomains):
+                score = (17 * row + 11 * k) % 100
+                domain_cell = f"{domain} ({60 + k})" if index == 0 else None
+                sheet.append([row, domain_cell, f"{subdomain} ({score})", 3, 15, score * 15 // 100])
+                row += 1
+            sheet.append([])
+        sheet.append([row, None, "UNSCORED", 3, None, None])
+        sheet.append([])
+
+        sheet = items.create_sheet(name)
+        sheet.append(["Items report"])
+        sheet.append([])
+        sheet.append(HEADER)
+        for q in range(20):
+            if q == 7:
+                sheet.append([])
+            sub_domain = SUBDOMAINS[q % 3][1][0]
+            sheet.append([q + 1, q + 1, f"Q{q}", "D", sub_domain, OPTIONS[(q + k) % 5], 3])
+        sheet.append([])
+        sheet.append([])
+    scores_path, items_path = tmp_path / "scores.xlsx", tmp_path / "items.xlsx"
+    scores.save(scores_path)
+    items.save(items_path)
+    return str(scores_path), str(items_path)
+
+
+def test_parser_backends_agree(tmp_path, monkeypatch):
+    import utils
+    scores_path, items_path = parser_workbooks(tmp_path)
+
+    outputs = {}
+    for backend in ("pandas", "openpyxl"):
+        monkeypatch.setattr(utils, "WORKBOOK_PARSER", backend)
+        outputs[backend] = (utils.extract_score(scores_path), utils.extract_items(items_path))
+
+    (pandas_scores, pandas_items), (streaming_scores, streaming_items) = outputs["pandas"], outputs["openpyxl"]
+    assert streaming_scores == pandas_scores
+    assert list(streaming_items) == list(pandas_items)
+    for key in pandas_items:
+        assert repr(streaming_items[key]) == repr(pandas_items[key]), key
+    # The fixture exercises renamed subdomains and all three candidates
+    assert len(pandas_scores) == 3
+    assert any(sub["name"] == "Emotional Composure" for domain in pandas_scores[0]["data"] for sub in domain["subdomains"])
+
+
+def test_screening_streams_workbooks(tmp_path, monkeypatch):
+    import io
+    import utils
+    from screening import screen_workbooks
+    scores_path, items_path = parser_workbooks(tmp_path)
+    monkeypatch.setattr(utils, "WORKBOOK_PARSER", "pandas")
+
+    def no_pandas(*args, **kwargs):
+        raise AssertionError("screening parsed an .xlsx upload with pandas")
+
+    monkeypatch.setattr(utils, "load_sheets", no_pandas)
+    # /screen passes uploads as in-memory buffers
+    with open(scores_path, "rb") as scores, open(items_path, "rb") as items:
+        table = screen_workbooks([("scores.xlsx", io.BytesIO(scores.read()), io.BytesIO(items.read()))])
+    assert [row[1] for row in table["rows"]] == ["Candidate 0", "Candidate 1", "Candidate 2"]